@@ -4,52 +4,107 @@ from flask_jwt_extended import JWTManager
 from flask_migrate import Migrate
 from flask_socketio import SocketIO
 from flask_cors import CORS
-from datetime import timedelta
+from contextlib import contextmanager
 import os
+import time
 from dotenv import load_dotenv
+from config import config, engine_options
+from db_routing import RoutingSession, REPLICA_BIND, init_db_routing
 
 # Load environment variables
 load_dotenv()
 
 # Initialize Flask extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
 migrate = Migrate()
 socketio = SocketIO()
 
-def create_app():
+@contextmanager
+def startup_phase(app, name):
+    """Record how long a step of create_app takes, for `flask startup-profile`."""
+    started = time.perf_counter()
+    yield
+    app.extensions.setdefault('startup_timings', []).append((name, time.perf_counter() - started))
+
+def create_app(config_name=None):
     app = Flask(__name__)
     
-    # Configure the Flask application
-    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-here')
-    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///foundxnet.db')
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key')
-    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
+    # Load settings from config.py, picked by FLASK_ENV unless given explicitly
+    app.config.from_object(config.get(config_name or os.getenv('FLASK_ENV'), config['default']))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'], app.config)
+    if app.config['DATABASE_REPLICA_URL']:
+        replica_url = app.config['DATABASE_REPLICA_URL']
+        app.config['SQLALCHEMY_BINDS'] = {
+            REPLICA_BIND: {'url': replica_url, **engine_options(replica_url, app.config)}
+        }
+    
+    # Encode JSON responses with orjson when it is installed
+    from serializers import FastJSONProvider
+    app.json = FastJSONProvider(app)
     
     # Initialize extensions
-    CORS(app)
-    db.init_app(app)
-    jwt.init_app(app)
-    migrate.init_app(app, db)
-    socketio.init_app(app, cors_allowed_origins="*")
+    with startup_phase(app, 'extensions'):
+        CORS(app)
+        db.init_app(app)
+        init_db_routing(app)
+        jwt.init_app(app)
+        migrate.init_app(app, db)
+        # Workers share rooms through the message queue (e.g. Redis) when one is configured
+        socketio.init_app(
+            app,
+            cors_allowed_origins="*",
+            message_queue=app.config['SOCKETIO_MESSAGE_QUEUE']
+        )
+    
+    with startup_phase(app, 'caches'):
+        from match_auth import init_pair_cache
+        from response_cache import init_response_cache
+        init_pair_cache(app)
+        init_response_cache(app)
     
     # Register blueprints
-    from routes.auth_routes import auth_bp
-    from routes.user_routes import user_bp
-    from routes.company_routes import company_bp
-    from routes.matchmaker import matchmaker_bp
-    from routes.chat import chat_bp
-    
-    app.register_blueprint(auth_bp, url_prefix='/api/auth')
-    app.register_blueprint(user_bp, url_prefix='/api/users')
-    app.register_blueprint(company_bp, url_prefix='/api/companies')
-    app.register_blueprint(matchmaker_bp, url_prefix='/api/matchmaking')
-    app.register_blueprint(chat_bp, url_prefix='/api/chat')
-    
-    # Create database tables
-    with app.app_context():
-        db.create_all()
+    with startup_phase(app, 'blueprints'):
+        from routes.auth_routes import auth_bp
+        from routes.user_routes import user_bp
+        from routes.company_routes import company_bp
+        from routes.matchmaker import matchmaker_bp
+        from routes.chat import chat_bp
+        from routes.admin_routes import admin_bp
+        
+        app.register_blueprint(auth_bp, url_prefix='/api/auth')
+        app.register_blueprint(user_bp, url_prefix='/api/users')
+        app.register_blueprint(company_bp, url_prefix='/api/companies')
+        app.register_blueprint(matchmaker_bp, url_prefix='/api/matchmaking')
+        app.register_blueprint(chat_bp, url_prefix='/api/chat')
+        app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    
+    # Request, SQL and cache metrics at /metrics
+    from metrics import init_metrics
+    init_metrics(app)
+    
+    # Development aid: flags N+1 query patterns and slow statements per request
+    from query_inspector import init_query_inspector
+    init_query_inspector(app)
+    
+    from startup_profile import startup_profile
+    app.cli.add_command(startup_profile)
+    
+    from bulk_import import import_command
+    app.cli.add_command(import_command)
+    
+    # Create database tables outside production, where migrations own the schema.
+    # Only on the primary: a read replica gets its schema through replication.
+    if app.config['AUTO_CREATE_TABLES']:
+        with startup_phase(app, 'create_all'), app.app_context():
+            db.create_all(bind_key=None)
+    
+    # Pay for scikit-learn at boot rather than on the first matchmaking request.
+    # Under `gunicorn --preload` this runs once in the master and workers inherit it.
+    if app.config['PRELOAD_ML_STACK']:
+        from company_index import preload_ml_stack
+        with startup_phase(app, 'preload_ml_stack'):
+            preload_ml_stack()
     
     return app
 
@@ -0,0 +1,270 @@
+"""Socket.IO chat load and delivery latency.
+
+Starts app servers on localhost the way production runs them (gunicorn, one
+eventlet worker each). It then connects K simulated founder/investor pairs
+with python-socketio clients. Each client logs in through /api/auth/login
+and joins its pair's room with the `join` event. The founder of every pair
+then sends `send_message` at a fixed rate. The time until the investor
+receives `new_message` is the delivery latency. Messages that haven't
+arrived by the end of the drain period count as dropped.
+
+Run from the backend directory:
+
+    python -m benchmarks.chat_load --pairs 100 --rate 2 --duration 30
+    python -m benchmarks.chat_load --pairs 200 --servers 3 --message-queue redis://localhost:6379/0 \\
+        --database postgresql://localhost/foundxnet_bench
+
+With several servers, the two clients of a pair connect to different
+servers, so every message crosses the message queue. SQLite locks under
+concurrent writers from several processes, so use a scratch PostgreSQL
+database there. Its tables are recreated. The clients need the Socket.IO
+client extras: pip install "python-socketio[client]".
+"""
+import argparse
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import socketio
+
+try:
+    import requests
+    import websocket  # noqa: F401 - websocket-client, for the websocket transport
+except ImportError:  # pragma: no cover - the client extras are optional
+    requests = None
+
+from benchmarks.endpoints import BACKEND_DIR, percentile
+
+class Stats:
+    """Send times and latencies shared by every client thread."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sent = {}
+        self.delivered = set()
+        self.delivery = []
+        self.acks = []
+        self.errors = 0
+
+    def record_send(self, content):
+        with self.lock:
+            self.sent[content] = time.perf_counter()
+
+    def record_delivery(self, content):
+        received = time.perf_counter()
+        with self.lock:
+            if content in self.sent and content not in self.delivered:
+                self.delivered.add(content)
+                self.delivery.append(received - self.sent[content])
+
+    def record_ack(self, sent_at, response):
+        with self.lock:
+            if not isinstance(response, dict) or 'error' in response:
+                self.errors += 1
+            else:
+                self.acks.append(time.perf_counter() - sent_at)
+
+    def record_error(self):
+        with self.lock:
+            self.errors += 1
+
+class Client:
+    """One simulated user with a logged-in socket in its pair's room."""
+
+    def __init__(self, url, email, password, other_id, stats):
+        self.url = url
+        self.email = email
+        self.password = password
+        self.other_id = other_id
+        self.stats = stats
+        self.user_id = None
+        self.sio = socketio.Client(reconnection=False)
+        self.sio.on('new_message', self._on_message)
+
+    def connect(self):
+        response = requests.post(
+            f'{self.url}/api/auth/login', json={'email': self.email, 'password': self.password}, timeout=120
+        )
+        response.raise_for_status()
+        body = response.json()
+        self.user_id = body['user']['id']
+
+        self.sio.connect(
+            self.url, headers={'Authorization': f'Bearer {body["access_token"]}'},
+            transports=['websocket'], wait_timeout=30
+        )
+        # An ack-requesting emit doubles as a barrier: we're in the room once it returns
+        self.sio.call('join', {'user_id': self.other_id}, timeout=30)
+
+    def _on_message(self, data):
+        # Both members of the room get new_message; only the receiver's copy counts
+        if data.get('receiver_id') == self.user_id:
+            self.stats.record_delivery(data['content'])
+
+    def send(self, content):
+        self.stats.record_send(content)
+        sent_at = time.perf_counter()
+        try:
+            self.sio.emit(
+                'send_message', {'receiver_id': self.other_id, 'content': content},
+                callback=lambda response=None: self.stats.record_ack(sent_at, response)
+            )
+        except socketio.exceptions.SocketIOError:
+            self.stats.record_error()
+
+    def close(self):
+        if self.sio.connected:
+            self.sio.disconnect()
+
+def seed(args):
+    """Create the matched pairs; returns [(founder email, investor email, founder id, investor id)]."""
+    from app import create_app, db
+    from benchmarks.datagen import generate
+
+    app = create_app()
+    with app.app_context():
+        if args.database:
+            db.drop_all()
+            db.create_all()
+        data = generate(args.pairs, args.pairs, seed=args.seed, matches_per_founder=1, thread_ratio=0)
+        db.engine.dispose()
+
+    emails = {user_id: f'founder{k}@bench.example' for k, user_id in enumerate(data['founders'])}
+    emails.update({user_id: f'investor{k}@bench.example' for k, user_id in enumerate(data['investors'])})
+    return [
+        (emails[founder_id], emails[investor_id], founder_id, investor_id)
+        for founder_id, investor_id in data['matches']
+    ], data['password']
+
+def start_servers(count, port, log_dir):
+    """Start `count` gunicorn eventlet workers on consecutive ports; returns [(url, process)]."""
+    servers = []
+    for n in range(count):
+        log = open(os.path.join(log_dir, f'server-{n}.log'), 'w')
+        process = subprocess.Popen([
+            sys.executable, '-m', 'gunicorn', '--worker-class', 'eventlet', '--workers', '1',
+            '--bind', f'127.0.0.1:{port + n}', 'app:create_app()'
+        ], cwd=BACKEND_DIR, stdout=log, stderr=subprocess.STDOUT)
+        servers.append((f'http://127.0.0.1:{port + n}', process))
+
+    for n, (url, process) in enumerate(servers):
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', port + n), timeout=1).close()
+                break
+            except OSError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    with open(os.path.join(log_dir, f'server-{n}.log')) as log:
+                        raise RuntimeError(f'Server {n} did not start:\n{log.read()}')
+                time.sleep(0.2)
+    return servers
+
+def send_loop(client, pair, rate, duration):
+    interval = 1 / rate
+    # Spread the pairs' first sends over one interval so they don't arrive in lockstep
+    next_at = time.perf_counter() + random.random() * interval
+    deadline = next_at + duration
+    sequence = 0
+    while next_at < deadline:
+        time.sleep(max(0.0, next_at - time.perf_counter()))
+        client.send(f'load {pair} {sequence}')
+        sequence += 1
+        next_at += interval
+
+def report(label, samples):
+    print(
+        f'{label:<10} {percentile(samples, 0.50) * 1000:9.1f} {percentile(samples, 0.95) * 1000:9.1f} '
+        f'{percentile(samples, 0.99) * 1000:9.1f} {max(samples, default=0.0) * 1000:9.1f}'
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--pairs', type=int, default=50, help='Simulated founder/investor pairs.')
+    parser.add_argument('--rate', type=float, default=1.0, help='Messages per second sent by each pair.')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds to send for.')
+    parser.add_argument('--drain', type=float, default=10.0, help='Seconds to wait for outstanding deliveries.')
+    parser.add_argument('--servers', type=int, default=1, help='App processes to start.')
+    parser.add_argument('--port', type=int, default=5100, help='Port of the first server.')
+    parser.add_argument('--message-queue', help='Socket.IO message queue URL; required with more than one server.')
+    parser.add_argument('--database', help='Scratch database URL instead of a temporary SQLite file.')
+    parser.add_argument('--connect-concurrency', type=int, default=20, help='Clients logging in at once.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if requests is None:
+        parser.error('the Socket.IO client extras are missing: pip install "python-socketio[client]"')
+    if args.servers > 1 and not args.message_queue:
+        parser.error('--message-queue is required with more than one server')
+
+    workdir = tempfile.mkdtemp(prefix='foundxnet-chat-load-')
+    os.environ['DATABASE_URL'] = args.database or f'sqlite:///{os.path.join(workdir, "chat.db")}'
+    os.environ['SOCKETIO_MESSAGE_QUEUE'] = args.message_queue or ''
+    os.environ['QUERY_INSPECTOR'] = 'False'
+
+    servers = []
+    clients = []
+    try:
+        pairs, password = seed(args)
+        servers = start_servers(args.servers, args.port, workdir)
+        urls = [url for url, _ in servers]
+
+        stats = Stats()
+        senders = []
+        for n, (founder_email, investor_email, founder_id, investor_id) in enumerate(pairs):
+            # The two ends of a pair sit on different servers whenever there is more than one
+            founder = Client(urls[n % len(urls)], founder_email, password, investor_id, stats)
+            investor = Client(urls[(n + 1) % len(urls)], investor_email, password, founder_id, stats)
+            clients += [founder, investor]
+            senders.append(founder)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(args.connect_concurrency) as pool:
+            list(pool.map(Client.connect, clients))
+        connect_seconds = time.perf_counter() - started
+
+        threads = [
+            threading.Thread(target=send_loop, args=(client, n, args.rate, args.duration))
+            for n, client in enumerate(senders)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        send_seconds = time.perf_counter() - started
+
+        deadline = time.monotonic() + args.drain
+        while len(stats.delivered) < len(stats.sent) and time.monotonic() < deadline:
+            time.sleep(0.1)
+
+        sent = len(stats.sent)
+        dropped = sent - len(stats.delivered)
+        print(
+            f'{len(pairs)} pairs on {len(servers)} server(s); {len(clients)} clients connected in '
+            f'{connect_seconds:.1f}s'
+        )
+        print(
+            f'sent {sent} ({sent / send_seconds:.1f}/s), delivered {len(stats.delivered)}, '
+            f'dropped {dropped} ({dropped / sent * 100 if sent else 0:.2f}%), errors {stats.errors}'
+        )
+        print(f'{"":<10} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"max ms":>9}')
+        report('delivery', stats.delivery)
+        report('ack', stats.acks)
+    finally:
+        for client in clients:
+            client.close()
+        for _, process in servers:
+            process.terminate()
+            process.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""Seeded synthetic data for benchmarks.
+
+`generate` fills an empty database with founders and investors, one company
+each with a generated description and funding rounds, matches between them
+and message threads on some of the matches. The same seed always produces
+the same data, so runs against different commits are comparable.
+"""
+from app import db
+from models import User, Company, FundingRound, Match, Message
+from passwords import hash_password
+from datetime import datetime, timedelta
+import random
+
+PASSWORD = 'benchmark-password'
+
+INDUSTRIES = [
+    'fintech', 'healthtech', 'edtech', 'climate', 'saas', 'ai', 'biotech',
+    'ecommerce', 'logistics', 'cybersecurity', 'proptech', 'gaming'
+]
+FUNDING_STAGES = ['pre_seed', 'seed', 'series_a', 'series_b', 'series_c', 'growth']
+
+# Median valuation by stage; actual valuations are log-normal around these
+STAGE_VALUATIONS = {
+    'pre_seed': 3e6, 'seed': 10e6, 'series_a': 40e6,
+    'series_b': 120e6, 'series_c': 400e6, 'growth': 1.5e9
+}
+
+PRODUCTS = ['platform', 'marketplace', 'API', 'mobile app', 'analytics suite', 'copilot', 'network', 'toolkit']
+CUSTOMERS = [
+    'small businesses', 'hospitals', 'logistics teams', 'independent retailers', 'software engineers',
+    'farmers', 'schools', 'insurance carriers', 'property managers', 'clinical researchers'
+]
+OUTCOMES = [
+    'cut operating costs', 'automate compliance', 'forecast demand', 'reduce fraud', 'hire faster',
+    'lower emissions', 'reach new customers', 'manage cash flow', 'speed up onboarding', 'secure their data'
+]
+TECHNIQUES = [
+    'machine learning', 'real-time data', 'computer vision', 'open banking', 'large language models',
+    'IoT sensors', 'a no-code workflow builder', 'satellite imagery', 'graph analytics', 'edge computing'
+]
+INVESTOR_THESES = [
+    'Early-stage fund backing {industry} founders', 'Operator-led fund focused on {industry}',
+    'Multi-stage investor in {industry} and adjacent markets', 'Angel syndicate writing first checks in {industry}'
+]
+FIRST_NAMES = ['Ada', 'Ben', 'Chen', 'Dara', 'Eli', 'Fatima', 'Gus', 'Hana', 'Ivan', 'Jade', 'Kofi', 'Lena', 'Mo', 'Nia']
+LAST_NAMES = ['Okafor', 'Patel', 'Quinn', 'Rossi', 'Sato', 'Tran', 'Usman', 'Varga', 'Weber', 'Xu', 'Yilmaz', 'Zhou']
+MESSAGE_LINES = [
+    'Thanks for connecting!', 'Would love to hear more about your traction.', 'Can you share the deck?',
+    'We closed two pilots last month.', 'What does the round look like?', 'Happy to intro you to our partners.',
+    'Are you free for a call on Thursday?', 'Our churn is under 2% monthly.', 'Sent over the data room link.'
+]
+
+BATCH_SIZE = 5000
+
+def company_description(rng, industry):
+    return (
+        f'{rng.choice(PRODUCTS).capitalize()} that helps {rng.choice(CUSTOMERS)} '
+        f'{rng.choice(OUTCOMES)} using {rng.choice(TECHNIQUES)}. Built for the {industry} market.'
+    )
+
+def _insert(model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(db.insert(model), rows[start:start + BATCH_SIZE])
+
+def _ids(model, count):
+    """Ids of the last `count` rows of `model`, in insertion order."""
+    return [row_id for (row_id,) in db.session.query(model.id).order_by(model.id.desc()).limit(count)][::-1]
+
+def generate(founders, investors, seed=0, matches_per_founder=5, thread_ratio=0.3, messages_per_thread=20):
+    """Insert the synthetic data set; call inside an app context on empty tables.
+
+    Returns a summary with the generated user ids by role, the match pairs
+    and the shared password.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+
+    # Hash once: every benchmark user shares the password, and hashing
+    # 100k passwords would dominate the setup time
+    password_hash = hash_password(PASSWORD)
+
+    users = {}
+    for role, count in (('founder', founders), ('investor', investors)):
+        companies = []
+        for k in range(count):
+            industry = rng.choice(INDUSTRIES)
+            stage = rng.choice(FUNDING_STAGES)
+            if role == 'founder':
+                description = company_description(rng, industry)
+            else:
+                description = rng.choice(INVESTOR_THESES).format(industry=industry)
+            companies.append({
+                'name': f'{role.capitalize()} Co {k}',
+                'description': description,
+                'industry': industry,
+                'funding_stage': stage,
+                'valuation': round(STAGE_VALUATIONS[stage] * rng.lognormvariate(0, 0.5), -3),
+                'created_at': now - timedelta(days=rng.randint(1, 1000))
+            })
+        _insert(Company, companies)
+        company_ids = _ids(Company, count)
+
+        _insert(User, [{
+            'email': f'{role}{k}@bench.example',
+            'password_hash': password_hash,
+            'name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            'role': role,
+            'bio': f'{role.capitalize()} working in {companies[k]["industry"]}.',
+            'company_id': company_id,
+            'created_at': companies[k]['created_at']
+        } for k, company_id in enumerate(company_ids)])
+        users[role] = _ids(User, count)
+
+        _insert(FundingRound, [{
+            'company_id': company_id,
+            'round_type': rng.choice(FUNDING_STAGES),
+            'amount': round(rng.lognormvariate(14, 1.2), -3),
+            'date': now - timedelta(days=rng.randint(1, 2000)),
+            'investors': ', '.join(rng.sample(LAST_NAMES, 2))
+        } for company_id in company_ids for _ in range(rng.randint(0, 3))])
+
+    pairs = set()
+    if users['founder'] and users['investor']:
+        for founder_id in users['founder']:
+            for investor_id in rng.sample(users['investor'], min(matches_per_founder, len(users['investor']))):
+                pairs.add((founder_id, investor_id))
+    pairs = sorted(pairs)
+    _insert(Match, [{
+        'founder_id': founder_id,
+        'investor_id': investor_id,
+        'match_score': round(rng.random(), 4),
+        'status': rng.choice(['pending', 'accepted', 'rejected'])
+    } for founder_id, investor_id in pairs])
+
+    messages = []
+    for founder_id, investor_id in pairs:
+        if rng.random() >= thread_ratio:
+            continue
+        started = now - timedelta(days=rng.randint(1, 90))
+        for n in range(messages_per_thread):
+            sender, receiver = (founder_id, investor_id) if n % 2 == 0 else (investor_id, founder_id)
+            messages.append({
+                'sender_id': sender,
+                'receiver_id': receiver,
+                'content': rng.choice(MESSAGE_LINES),
+                'created_at': started + timedelta(minutes=7 * n),
+                'read': n < messages_per_thread - 2
+            })
+    _insert(Message, messages)
+
+    db.session.commit()
+    return {
+        'founders': users['founder'],
+        'investors': users['investor'],
+        'matches': pairs,
+        'messages': len(messages),
+        'password': PASSWORD
+    }
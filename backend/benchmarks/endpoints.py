@@ -0,0 +1,320 @@
+"""Endpoint benchmarks over synthetic data.
+
+Each scale runs in a fresh process. That process seeds a database with
+benchmarks.datagen and drives every HTTP route through the Flask test client
+and the chat socket events through the Socket.IO test client. It reports
+p50/p95/p99 latency and SQL statements per call for each route, plus the
+process's peak RSS. Results are written to a JSON file, so runs can be
+compared between commits.
+
+Run from the backend directory:
+
+    python -m benchmarks.endpoints --users 1000 --users 10000
+    python -m benchmarks.endpoints --users 1000 --database postgresql://localhost/foundxnet_bench
+    python -m benchmarks.endpoints --users 1000 --compare benchmarks/results/<earlier run>.json
+
+A --database URL must point at a scratch database: its tables are dropped
+and recreated for every scale.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'benchmarks', 'results')
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, int(round(p * len(values))) - 1))]
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def summarize(latencies, statements, errors):
+    return {
+        'calls': len(latencies),
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        'queries_mean': round(sum(statements) / len(statements), 2) if statements else 0.0,
+        'queries_max': max(statements, default=0)
+    }
+
+def run_scale(args):
+    """Seed one scale and benchmark it in this process; returns its results."""
+    workdir = tempfile.mkdtemp(prefix='foundxnet-bench-')
+    os.environ['DATABASE_URL'] = args.database or f'sqlite:///{os.path.join(workdir, "bench.db")}'
+    os.environ['SOCKETIO_MESSAGE_QUEUE'] = ''
+    os.environ['COMPANY_VECTOR_STORE'] = os.path.join(workdir, 'company_vectors')
+    os.environ['QUERY_INSPECTOR'] = 'False'
+
+    sys.path.insert(0, BACKEND_DIR)
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from app import create_app, db, socketio
+    from models import User, Match, Message
+    from identity import issue_token
+    from benchmarks.datagen import generate, PASSWORD
+
+    app = create_app()
+    founders = args.users // 2
+    investors = args.users - founders
+
+    started = time.perf_counter()
+    with app.app_context():
+        if args.database:
+            db.drop_all()
+            db.create_all()
+        data = generate(founders, investors, seed=args.seed)
+        companies = dict(db.session.query(User.id, User.company_id))
+        match_owners = db.session.query(Match.id, Match.founder_id).order_by(Match.id).limit(5000).all()
+        unread = db.session.query(Message.id, Message.receiver_id).filter(
+            Message.read.is_(False)
+        ).order_by(Message.id).limit(5000).all()
+    seed_seconds = time.perf_counter() - started
+
+    statements = [0]
+    event.listen(Engine, 'after_cursor_execute', lambda *_: statements.__setitem__(0, statements[0] + 1))
+
+    rng = random.Random(args.seed)
+    client = app.test_client()
+    tokens = {}
+
+    def auth(user_id):
+        if user_id not in tokens:
+            with app.app_context():
+                tokens[user_id] = {'Authorization': f'Bearer {issue_token(db.session.get(User, user_id))}'}
+        return tokens[user_id]
+
+    def any_user():
+        return rng.choice(data['founders'] + data['investors'] if rng.random() < 0.5 else data['founders'])
+
+    def http(method, url, user_id=None, **kwargs):
+        headers = auth(user_id) if user_id else {}
+        return lambda: getattr(client, method)(url, headers=headers, **kwargs).status_code
+
+    new_founders = []
+
+    def signup(i):
+        def call():
+            response = client.post('/api/auth/signup', json={
+                'email': f'new{i}@bench.example', 'password': PASSWORD, 'name': 'New Founder', 'role': 'founder'
+            })
+            new_founders.append(response.get_json().get('access_token'))
+            return response.status_code
+        return call
+
+    def add_company(i):
+        headers = {'Authorization': f'Bearer {new_founders[i % len(new_founders)]}'}
+        return lambda: client.post('/api/companies/add', headers=headers, json={
+            'name': f'New Co {i}', 'description': 'Platform that helps schools forecast demand using real-time data.',
+            'industry': 'edtech', 'funding_stage': 'seed', 'valuation': 5e6
+        }).status_code
+
+    def founder_company(method, suffix, **kwargs):
+        def scenario(i):
+            founder = rng.choice(data['founders'])
+            return http(method, f'/api/companies/{companies[founder]}{suffix}', founder, **kwargs)
+        return scenario
+
+    def matched(i):
+        return rng.choice(data['matches'])
+
+    words = ['fintech', 'climate', 'saas', 'Patel', 'Ada', 'health', 'ai', 'Zhou']
+
+    scenarios = [
+        ('POST /api/auth/signup', signup),
+        ('POST /api/auth/login', lambda i: http('post', '/api/auth/login', json={
+            'email': f'founder{rng.randrange(founders)}@bench.example', 'password': PASSWORD
+        })),
+        ('GET /api/auth/me', lambda i: http('get', '/api/auth/me', any_user())),
+        ('GET /api/users/profile', lambda i: http('get', '/api/users/profile', any_user())),
+        ('PUT /api/users/profile', lambda i: http('put', '/api/users/profile', any_user(), json={'bio': f'Updated bio {i}'})),
+        ('GET /api/users/search', lambda i: http('get', f'/api/users/search?q={rng.choice(words)}', any_user())),
+        ('GET /api/users/connections', lambda i: http('get', '/api/users/connections', any_user())),
+        ('GET /api/users/<id>', lambda i: http('get', f'/api/users/{any_user()}', any_user())),
+        ('POST /api/companies/add', add_company),
+        ('GET /api/companies/<id>', lambda i: http('get', f'/api/companies/{companies[any_user()]}', any_user())),
+        ('POST /api/companies/<id>/funding', founder_company('post', '/funding', json={
+            'round_type': 'seed', 'amount': 1e6, 'date': '2024-01-15', 'investors': 'Bench Capital'
+        })),
+        ('PUT /api/companies/<id>', founder_company('put', '', json={'valuation': 12e6})),
+        ('GET /api/matchmaking/matches', lambda i: http('get', '/api/matchmaking/matches', any_user())),
+        ('POST /api/matchmaking/connect', lambda i: http(
+            'post', '/api/matchmaking/connect', rng.choice(data['founders']),
+            json={'target_user_id': rng.choice(data['investors'])}
+        )),
+        ('PUT /api/matchmaking/matches/<id>/status', lambda i: (lambda match: http(
+            'put', f'/api/matchmaking/matches/{match[0]}/status', match[1], json={'status': 'accepted'}
+        ))(rng.choice(match_owners))),
+        ('GET /api/chat/history/<user_id>', lambda i: (lambda pair: http(
+            'get', f'/api/chat/history/{pair[1]}', pair[0]
+        ))(matched(i))),
+        ('GET /api/chat/conversations', lambda i: http('get', '/api/chat/conversations', matched(i)[1])),
+        ('POST /api/chat/send', lambda i: (lambda pair: http(
+            'post', '/api/chat/send', pair[0], json={'receiver_id': pair[1], 'content': f'Benchmark message {i}'}
+        ))(matched(i))),
+        ('PUT /api/chat/read/<id>', lambda i: (lambda message: http(
+            'put', f'/api/chat/read/{message[0]}', message[1]
+        ))(unread[i % len(unread)])),
+        ('PUT /api/chat/read', lambda i: (lambda pair: http(
+            'put', '/api/chat/read', pair[1], json={'user_id': pair[0], 'up_to_message_id': 2 ** 31 - 1}
+        ))(matched(i)))
+    ]
+
+    def socket_scenarios():
+        sockets = {}
+
+        def connected(user_id):
+            if user_id not in sockets:
+                sockets[user_id] = socketio.test_client(app, headers=auth(user_id))
+            return sockets[user_id]
+
+        def emit(event_name, payload_for, callback=False):
+            def scenario(i):
+                founder, investor = matched(i)
+                sock = connected(founder)
+                payload = payload_for(i, investor)
+
+                def call():
+                    result = sock.emit(event_name, payload, callback=callback)
+                    sock.get_received()
+                    return 400 if isinstance(result, dict) and 'error' in result else 200
+                return call
+            return scenario
+
+        return [
+            ('socket join', emit('join', lambda i, other: {'user_id': other})),
+            ('socket send_message', emit(
+                'send_message', lambda i, other: {'receiver_id': other, 'content': f'Socket message {i}'}, callback=True
+            )),
+            ('socket leave', emit('leave', lambda i, other: {'user_id': other}))
+        ]
+
+    routes = {}
+    for name, scenario in scenarios + socket_scenarios():
+        latencies, counts, errors = [], [], 0
+        for i in range(args.calls):
+            call = scenario(i)
+            before = statements[0]
+            started = time.perf_counter()
+            status = call()
+            latencies.append(time.perf_counter() - started)
+            counts.append(statements[0] - before)
+            if status >= 400:
+                errors += 1
+        routes[name] = summarize(latencies, counts, errors)
+
+    return {
+        'users': args.users,
+        'founders': founders,
+        'investors': investors,
+        'matches': len(data['matches']),
+        'messages': data['messages'],
+        'seed_seconds': round(seed_seconds, 2),
+        'peak_rss_mb': peak_rss_mb(),
+        'routes': routes
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_scale(scale):
+    print(
+        f'\n{scale["users"]} users ({scale["matches"]} matches, {scale["messages"]} messages), '
+        f'seeded in {scale["seed_seconds"]}s, peak RSS {scale["peak_rss_mb"]} MB'
+    )
+    print(f'{"route":<42} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"queries":>8} {"errors":>7}')
+    for name, stats in scale['routes'].items():
+        print(
+            f'{name:<42} {stats["p50_ms"]:9.2f} {stats["p95_ms"]:9.2f} {stats["p99_ms"]:9.2f} '
+            f'{stats["queries_mean"]:8.1f} {stats["errors"]:7d}'
+        )
+
+def print_comparison(previous, current):
+    print(f'\nCompared with {previous.get("commit")} ({previous.get("created_at")}), p95:')
+    earlier = {scale['users']: scale for scale in previous['scales']}
+    for scale in current['scales']:
+        if scale['users'] not in earlier:
+            continue
+        print(f'\n{scale["users"]} users')
+        for name, stats in scale['routes'].items():
+            before = earlier[scale['users']]['routes'].get(name)
+            if not before or not before['p95_ms']:
+                continue
+            change = (stats['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100
+            print(f'  {name:<42} {before["p95_ms"]:9.2f} -> {stats["p95_ms"]:9.2f} ms ({change:+.0f}%)')
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every route against synthetic data.')
+    parser.add_argument('--users', type=int, action='append', help='Users per scale; repeat for several scales (default 1000).')
+    parser.add_argument('--calls', type=int, default=50, help='Calls per route and scale.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--database', help='Scratch database URL (e.g. PostgreSQL) instead of a temporary SQLite file.')
+    parser.add_argument('--output', help='Results file (default benchmarks/results/<timestamp>-<commit>.json).')
+    parser.add_argument('--compare', help='Earlier results file to compare p95 latencies against.')
+    parser.add_argument('--run-one', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        args.users = args.users[0]
+        print(json.dumps(run_scale(args)))
+        return
+
+    scales = []
+    for users in args.users or [1000]:
+        command = [
+            sys.executable, '-m', 'benchmarks.endpoints', '--run-one',
+            '--users', str(users), '--calls', str(args.calls), '--seed', str(args.seed)
+        ]
+        if args.database:
+            command += ['--database', args.database]
+        result = subprocess.run(command, cwd=BACKEND_DIR, capture_output=True, text=True)
+        if result.returncode != 0:
+            sys.exit(f'Scale {users} failed:\n{result.stderr}')
+        scale = json.loads(result.stdout.strip().splitlines()[-1])
+        print_scale(scale)
+        scales.append(scale)
+
+    commit = git_commit()
+    results = {
+        'commit': commit,
+        'created_at': datetime.utcnow().isoformat(),
+        'database': (args.database or 'sqlite').split(':', 1)[0],
+        'calls': args.calls,
+        'seed': args.seed,
+        'scales': scales
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f'{datetime.utcnow().strftime("%Y%m%dT%H%M%S")}-{commit or "unknown"}.json'
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'\nWrote {output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Hub latency during a login storm.
+
+Runs the app in-process under eventlet, the way the production worker does.
+A probe greenthread sleeps PROBE_INTERVAL in a loop and records how late it
+wakes up: that delay is what every socket event (and so every chat message)
+waits before the hub gets to it. The probe runs while idle, then during a
+burst of concurrent logins with password hashing on the hub, then with
+hashing offloaded to eventlet's native thread pool.
+
+    python benchmarks/login_storm.py --logins 100 --concurrency 20
+"""
+import eventlet
+eventlet.monkey_patch()
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROBE_INTERVAL = 0.01
+EMAIL = 'storm@example.com'
+PASSWORD = 'correct horse battery staple'
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+def probe(samples, stop):
+    while not stop.ready():
+        start = time.perf_counter()
+        eventlet.sleep(PROBE_INTERVAL)
+        samples.append(time.perf_counter() - start - PROBE_INTERVAL)
+
+def run(app, logins, concurrency):
+    """Log in `logins` times, `concurrency` at a time, and return (seconds, lag samples)."""
+    samples = []
+    stop = eventlet.Event()
+    prober = eventlet.spawn(probe, samples, stop)
+
+    def login(_):
+        response = app.test_client().post('/api/auth/login', json={'email': EMAIL, 'password': PASSWORD})
+        assert response.status_code == 200, response.data
+
+    start = time.perf_counter()
+    pool = eventlet.GreenPool(concurrency)
+    for _ in pool.imap(login, range(logins)):
+        pass
+    elapsed = time.perf_counter() - start
+
+    stop.send()
+    prober.wait()
+    return elapsed, samples
+
+def idle(seconds):
+    samples = []
+    stop = eventlet.Event()
+    prober = eventlet.spawn(probe, samples, stop)
+    eventlet.sleep(seconds)
+    stop.send()
+    prober.wait()
+    return samples
+
+def report(label, samples, logins=None, elapsed=None):
+    rate = f'{logins / elapsed:8.1f}' if elapsed else f'{"-":>8}'
+    print(
+        f'{label:<12} {rate} {percentile(samples, 0.5) * 1000:9.1f} '
+        f'{percentile(samples, 0.99) * 1000:9.1f} {max(samples, default=0.0) * 1000:9.1f}'
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--logins', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=20)
+    args = parser.parse_args()
+
+    database = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    database.close()
+    os.environ['DATABASE_URL'] = f'sqlite:///{database.name}'
+    os.environ['SOCKETIO_MESSAGE_QUEUE'] = ''
+
+    import passwords
+    from app import create_app, db
+    from models import User
+
+    app = create_app()
+    with app.app_context():
+        user = User(email=EMAIL, name='Storm', role='founder')
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+
+    try:
+        print(f'{"":<12} {"logins/s":>8} {"p50 ms":>9} {"p99 ms":>9} {"max ms":>9}')
+        report('idle', idle(1.0))
+
+        offload = passwords.offload
+        passwords.offload = lambda fn, *fn_args: fn(*fn_args)
+        elapsed, samples = run(app, args.logins, args.concurrency)
+        report('on hub', samples, args.logins, elapsed)
+
+        passwords.offload = offload
+        elapsed, samples = run(app, args.logins, args.concurrency)
+        report('offloaded', samples, args.logins, elapsed)
+    finally:
+        os.unlink(database.name)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+"""Streaming bulk import of companies, users and funding rounds.
+
+Records arrive one per NDJSON line or CSV row, and each has a `type` of
+company, user or funding_round. A company carries a `ref` chosen by whoever
+produced the file. Users and funding rounds point at a company through
+`company`, which must name a ref that appeared earlier in the file. Rows are
+validated as they are read and written in batches. Every batch is one
+transaction. If the database rejects a batch, its rows are retried one
+transaction each, so a bad row is reported with its line number without
+holding back the rest.
+
+    {"type": "company", "ref": "acme", "name": "Acme", "description": "...", "industry": "saas", "funding_stage": "seed"}
+    {"type": "user", "email": "ada@acme.io", "password": "...", "name": "Ada", "role": "founder", "company": "acme"}
+    {"type": "funding_round", "company": "acme", "round_type": "seed", "amount": 1500000, "date": "2024-03-01"}
+
+CSV files use the same field names as columns; empty cells count as missing.
+"""
+from flask import current_app
+from flask.cli import with_appcontext
+from app import db
+from models import Company, User, FundingRound
+from passwords import hash_passwords
+from company_index import invalidate_company_index
+from vector_store import build_vector_store, load_vector_store, store_directory
+from response_cache import invalidate_match_lists
+from datetime import datetime
+from collections import ChainMap
+import click
+import codecs
+import csv
+import json
+
+FORMATS = ('ndjson', 'csv')
+ROLES = ('founder', 'investor')
+
+# Per-row errors kept for the report; later ones are only counted
+MAX_REPORTED_ERRORS = 1000
+
+class RowError(ValueError):
+    pass
+
+def read_records(stream, file_format):
+    """Yield (line number, record or RowError) from a binary stream, one line at a time."""
+    lines = codecs.iterdecode(stream, 'utf-8-sig')
+    if file_format == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, {key: value for key, value in row.items() if key and value not in (None, '')}
+        return
+
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, RowError(f'Invalid JSON: {e}')
+            continue
+        yield number, record if isinstance(record, dict) else RowError('Expected a JSON object')
+
+def _text(record, field, max_length=None, required=True):
+    value = record.get(field)
+    if value is None or str(value).strip() == '':
+        if required:
+            raise RowError(f'Missing {field}')
+        return None
+    value = str(value).strip()
+    if max_length and len(value) > max_length:
+        raise RowError(f'{field} is longer than {max_length} characters')
+    return value
+
+def _number(record, field, required=True):
+    value = record.get(field)
+    if value is None:
+        if required:
+            raise RowError(f'Missing {field}')
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise RowError(f'{field} must be a number')
+
+def _company_row(record):
+    valuation = _number(record, 'valuation', required=False)
+    if valuation is not None and valuation < 0:
+        raise RowError('valuation must not be negative')
+    return {
+        'name': _text(record, 'name', 100),
+        'description': _text(record, 'description'),
+        'industry': _text(record, 'industry', 50),
+        'funding_stage': _text(record, 'funding_stage', 50),
+        'valuation': valuation
+    }
+
+def _user_row(record):
+    role = _text(record, 'role')
+    if role not in ROLES:
+        raise RowError(f'role must be one of {", ".join(ROLES)}')
+    return {
+        'email': _text(record, 'email', 120).lower(),
+        'password': _text(record, 'password'),
+        'name': _text(record, 'name', 100),
+        'role': role,
+        'bio': _text(record, 'bio', required=False)
+    }
+
+def _funding_round_row(record):
+    try:
+        date = datetime.fromisoformat(_text(record, 'date'))
+    except ValueError:
+        raise RowError('date must be an ISO 8601 date')
+    return {
+        'round_type': _text(record, 'round_type', 50),
+        'amount': _number(record, 'amount'),
+        'date': date,
+        'investors': _text(record, 'investors', 200, required=False) or ''
+    }
+
+class BulkImport:
+    """Validates records as they are added and writes them in batches of `batch_size`."""
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        self.counts = {'company': 0, 'user': 0, 'funding_round': 0}
+        self.errors = []
+        self.error_count = 0
+        self._company_ids = {}  # ref -> id of companies already written
+        self._pending_refs = set()
+        self._emails = set()
+        self._pending = []
+
+    def error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def add(self, line, record):
+        if isinstance(record, RowError):
+            return self.error(line, str(record))
+        try:
+            kind = record.get('type')
+            if kind == 'company':
+                ref = _text(record, 'ref')
+                if ref in self._company_ids or ref in self._pending_refs:
+                    raise RowError(f'Duplicate company ref {ref!r}')
+                row = _company_row(record)
+                self._pending_refs.add(ref)
+            elif kind in ('user', 'funding_round'):
+                row = _user_row(record) if kind == 'user' else _funding_round_row(record)
+                ref = _text(record, 'company', required=(kind == 'funding_round'))
+                if ref is not None and ref not in self._company_ids and ref not in self._pending_refs:
+                    raise RowError(f'Unknown company ref {ref!r}; companies must come before rows that use them')
+                if kind == 'user':
+                    if row['email'] in self._emails:
+                        raise RowError(f'Duplicate email {row["email"]}')
+                    self._emails.add(row['email'])
+            else:
+                raise RowError('type must be company, user or funding_round')
+        except RowError as e:
+            return self.error(line, str(e))
+
+        self._pending.append((line, kind, ref, row))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        batch, self._pending = self._pending, []
+        self._pending_refs = set()
+        if not batch:
+            return
+
+        try:
+            self._write(batch)
+        except Exception:
+            db.session.rollback()
+            # The database rejected something in the batch; write the rows one
+            # transaction each so only the offending ones are reported
+            for item in batch:
+                try:
+                    self._write([item])
+                except Exception as e:
+                    db.session.rollback()
+                    line, kind, _, row = item
+                    if kind == 'user':
+                        self._emails.discard(row['email'])
+                    self.error(line, str(getattr(e, 'orig', None) or e))
+
+    def _write(self, batch):
+        """Insert `batch` in one transaction and commit it. Records nothing if it raises."""
+        companies = [(ref, row) for _, kind, ref, row in batch if kind == 'company']
+        users = [(line, ref, row) for line, kind, ref, row in batch if kind == 'user']
+        rounds = [(ref, row) for _, kind, ref, row in batch if kind == 'funding_round']
+
+        new_ids = {}
+        if companies:
+            ids = db.session.execute(
+                db.insert(Company).returning(Company.id, sort_by_parameter_order=True),
+                [row for _, row in companies]
+            ).scalars().all()
+            new_ids = dict(zip((ref for ref, _ in companies), ids))
+        company_ids = ChainMap(new_ids, self._company_ids)
+
+        # Retried rows may name a company whose own row failed
+        for ref in [ref for _, ref, _ in users] + [ref for ref, _ in rounds]:
+            if ref is not None and ref not in company_ids:
+                raise RowError(f'Company {ref!r} was not imported')
+
+        # Emails taken by accounts that existed before the import
+        taken = {
+            email for (email,) in db.session.query(User.email).filter(
+                User.email.in_([row['email'] for _, _, row in users])
+            )
+        } if users else set()
+        rejected = [(line, row) for line, _, row in users if row['email'] in taken]
+        users = [(line, ref, row) for line, ref, row in users if row['email'] not in taken]
+
+        if users:
+            hashes = hash_passwords([row['password'] for _, _, row in users])
+            db.session.execute(db.insert(User), [{
+                'email': row['email'],
+                'password_hash': password_hash,
+                'name': row['name'],
+                'role': row['role'],
+                'bio': row['bio'],
+                'company_id': company_ids[ref] if ref is not None else None
+            } for (_, ref, row), password_hash in zip(users, hashes)])
+
+        if rounds:
+            db.session.execute(db.insert(FundingRound), [
+                dict(row, company_id=company_ids[ref]) for ref, row in rounds
+            ])
+
+        db.session.commit()
+
+        for line, row in rejected:
+            self.error(line, f'Email {row["email"]} is already registered')
+        self._company_ids.update(new_ids)
+        self.counts['company'] += len(companies)
+        self.counts['user'] += len(users)
+        self.counts['funding_round'] += len(rounds)
+
+    def finish(self):
+        """Write what is left and make the new companies visible to matchmaking.
+
+        Every worker refits its TF-IDF index once it sees a newer company id.
+        A published vector store is rebuilt with the same number of dimensions,
+        and workers map the new build on their next request. Cached match
+        lists are retired, since any of them may now include new users.
+        """
+        self.flush()
+        if self.counts['company']:
+            invalidate_company_index()
+            store = load_vector_store()
+            if store is not None:
+                build_vector_store(store_directory(), n_components=store.matrix.shape[1])
+        if self.counts['company'] or self.counts['user']:
+            invalidate_match_lists()
+        return self.result()
+
+    def result(self):
+        return {
+            'imported': self.counts,
+            'error_count': self.error_count,
+            'errors': self.errors
+        }
+
+def import_stream(stream, file_format, batch_size=None):
+    """Import every record in a binary stream; returns the counts and per-row errors."""
+    if file_format not in FORMATS:
+        raise ValueError(f'format must be one of {", ".join(FORMATS)}')
+    bulk = BulkImport(batch_size or current_app.config.get('IMPORT_BATCH_SIZE', 500))
+    for line, record in read_records(stream, file_format):
+        bulk.add(line, record)
+    return bulk.finish()
+
+@click.command('import')
+@click.argument('source', type=click.File('rb'))
+@click.option('--format', 'file_format', type=click.Choice(FORMATS), help='Defaults to csv for .csv files, else ndjson.')
+@click.option('--batch-size', type=int, default=None, help='Rows per transaction (defaults to IMPORT_BATCH_SIZE).')
+@with_appcontext
+def import_command(source, file_format, batch_size):
+    """Bulk import companies, users and funding rounds from an NDJSON or CSV file ('-' for stdin)."""
+    file_format = file_format or ('csv' if source.name.lower().endswith('.csv') else 'ndjson')
+    result = import_stream(source, file_format, batch_size)
+
+    imported = result['imported']
+    click.echo(
+        f"Imported {imported['company']} companies, {imported['user']} users and "
+        f"{imported['funding_round']} funding rounds; {result['error_count']} rows failed"
+    )
+    for error in result['errors'][:20]:
+        click.echo(f"  line {error['line']}: {error['error']}", err=True)
+    if result['error_count'] > 20:
+        click.echo(f"  ... and {result['error_count'] - 20} more", err=True)
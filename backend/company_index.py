@@ -0,0 +1,128 @@
+from models import Company, db
+import importlib
+
+# scikit-learn, SciPy and NumPy take most of a cold start, so matchmaking
+# modules import them inside the functions that need them; see preload_ml_stack
+ML_MODULES = (
+    'numpy',
+    'scipy.sparse',
+    'sklearn.feature_extraction.text',
+    'sklearn.decomposition',
+    'sklearn.preprocessing'
+)
+
+def preload_ml_stack():
+    """Import the ML stack up front instead of on the first matchmaking request."""
+    for name in ML_MODULES:
+        importlib.import_module(name)
+
+def company_text(company):
+    """Combine the company fields used for matching into a single document."""
+    return ' '.join(part for part in [company.description, company.industry] if part)
+
+class CompanyIndex:
+    """TF-IDF vectors for every company, fit once over the whole corpus.
+
+    Rows are L2-normalised, so cosine similarity is a plain dot product and
+    scoring one company against many is a single sparse matrix-vector product.
+    """
+
+    def __init__(self, vectorizer, matrix, company_ids, latest_company_id=None, row_versions=()):
+        self.vectorizer = vectorizer
+        self.matrix = matrix
+        self.company_ids = list(company_ids)
+        self.rows = {company_id: row for row, company_id in enumerate(self.company_ids)}
+        self.latest_company_id = latest_company_id
+        self.row_versions = list(row_versions)
+
+    @classmethod
+    def build(cls, companies):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        companies = list(companies)
+        texts = [company_text(company) for company in companies]
+        latest_company_id = max((company.id for company in companies), default=None)
+        vectorizer = TfidfVectorizer()
+        try:
+            matrix = vectorizer.fit_transform(texts)
+        except ValueError:
+            # Empty corpus or no usable vocabulary
+            return cls(None, None, [], latest_company_id)
+        return cls(
+            vectorizer, matrix, [company.id for company in companies], latest_company_id,
+            [company.row_version for company in companies]
+        )
+
+    @property
+    def version(self):
+        """Names the fit; scores computed from different fits aren't comparable."""
+        return f'tfidf-{self.latest_company_id}'
+
+    def current_row(self, company):
+        """The company's row, or None if it was added or edited since the fit."""
+        row = self.rows.get(company.id)
+        if row is None or self.row_versions[row] != company.row_version:
+            return None
+        return row
+
+    def vector(self, company):
+        """Return the row vector for a company, transforming its text if the row is missing or stale."""
+        if self.vectorizer is None:
+            return None
+        row = self.current_row(company)
+        if row is not None:
+            return self.matrix[row]
+        return self.vectorizer.transform([company_text(company)])
+
+    def vectors(self, companies):
+        """Sparse row vectors for `companies`, transforming those without a current row.
+
+        Companies added or edited since the fit (by another worker, an import or
+        a direct write) are transformed from their current text, so they score
+        on the same scale as indexed ones and never from an outdated row.
+        """
+        from scipy import sparse
+
+        companies = list(companies)
+        rows = [self.current_row(company) for company in companies]
+        if all(row is not None for row in rows):
+            return self.matrix[rows]
+        return sparse.vstack([
+            self.matrix[row] if row is not None else self.vectorizer.transform([company_text(company)])
+            for company, row in zip(companies, rows)
+        ]).tocsr()
+
+    def similarities(self, company, candidates):
+        """Cosine similarity of `company` against each of the `candidates` companies."""
+        import numpy as np
+
+        candidates = list(candidates)
+        vector = self.vector(company)
+        if vector is None or not candidates:
+            return np.zeros(len(candidates))
+        return (self.vectors(candidates) @ vector.T).toarray().ravel()
+
+_index = None
+
+def get_company_index():
+    """Return the shared company index, refitting it when missing or out of date.
+
+    Other workers and imports can't invalidate this process's index, so the
+    newest company id in the database (a single primary key lookup) doubles as
+    a version stamp: when it moves past the one the index was fit with, the
+    index is refit over the new vocabulary. Edits don't move it; the index
+    compares each company's row_version on every lookup instead.
+    """
+    global _index
+    # An index fit over no text can't transform anything, so retry until there is some
+    if (
+        _index is None or _index.vectorizer is None or
+        db.session.query(db.func.max(Company.id)).scalar() != _index.latest_company_id
+    ):
+        _index = CompanyIndex.build(Company.query.all())
+    return _index
+
+def invalidate_company_index():
+    """Drop the shared index so the next lookup refits it over current company text."""
+    global _index
+    _index = None
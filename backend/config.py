@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -13,14 +14,71 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///foundxnet.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Connection pool, applied to the primary and the replica (ignored for SQLite)
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 10))  # seconds to wait for a connection
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))  # seconds before a connection is replaced
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'True').lower() == 'true'
+    
+    # Optional read replica; GET requests read from it unless the user wrote in the last
+    # DATABASE_REPLICA_STICKY_SECONDS. Recent writers are tracked per process unless
+    # DATABASE_REPLICA_STICKY_CACHE_URL points every worker at a shared Redis.
+    DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL')
+    DATABASE_REPLICA_STICKY_SECONDS = int(os.getenv('DATABASE_REPLICA_STICKY_SECONDS', 5))
+    DATABASE_REPLICA_STICKY_CACHE_SIZE = int(os.getenv('DATABASE_REPLICA_STICKY_CACHE_SIZE', 10000))
+    DATABASE_REPLICA_STICKY_CACHE_URL = os.getenv('DATABASE_REPLICA_STICKY_CACHE_URL')
+    
     # JWT settings
-    JWT_ACCESS_TOKEN_EXPIRES = 3600  # 1 hour
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
+    
+    # Password hashing: 'pbkdf2:sha256', 'pbkdf2:sha512', 'scrypt' or 'bcrypt'. The cost is
+    # iterations (PBKDF2), N (scrypt) or log2 rounds (bcrypt); unset uses the algorithm's default.
+    # Existing hashes are upgraded on the user's next login.
+    PASSWORD_HASH_ALGORITHM = os.getenv('PASSWORD_HASH_ALGORITHM', 'pbkdf2:sha256')
+    PASSWORD_HASH_COST = int(os.getenv('PASSWORD_HASH_COST') or 0) or None
     
     # OpenAI settings for enhanced matching
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
     
+    # Matchmaking settings; set to False to also weigh industry and valuation
+    MATCH_SCORE_COMPAT = os.getenv('MATCH_SCORE_COMPAT', 'True').lower() == 'true'
+    # Directory holding the memory-mapped company vectors built by `flask matchmaking build-vectors`
+    COMPANY_VECTOR_STORE = os.getenv('COMPANY_VECTOR_STORE', os.path.join(os.path.dirname(__file__), 'instance', 'company_vectors'))
+    
+    # Import scikit-learn/NumPy at startup instead of on first matchmaking use
+    PRELOAD_ML_STACK = os.getenv('PRELOAD_ML_STACK', 'False').lower() == 'true'
+    # Create missing tables on startup; production relies on `flask db upgrade` instead
+    AUTO_CREATE_TABLES = os.getenv('AUTO_CREATE_TABLES', 'True').lower() == 'true'
+    
     # WebSocket settings
-    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE', 'redis://localhost:6379')
+    # Workers share rooms through the message queue (e.g. Redis) when one is configured
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE') or None
+    
+    # Chat authorization cache: in-process LRU by default, shared Redis when a URL is set
+    CHAT_AUTH_CACHE_SIZE = int(os.getenv('CHAT_AUTH_CACHE_SIZE', 10000))
+    CHAT_AUTH_CACHE_TTL = int(os.getenv('CHAT_AUTH_CACHE_TTL', 300))  # seconds
+    CHAT_AUTH_CACHE_URL = os.getenv('CHAT_AUTH_CACHE_URL')
+    
+    # Rendered JSON cache for hot reads: short-lived per-process tier plus an optional shared Redis tier
+    RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 1000))
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 30))  # seconds
+    RESPONSE_CACHE_SHARED_TTL = int(os.getenv('RESPONSE_CACHE_SHARED_TTL', 300))  # seconds
+    RESPONSE_CACHE_URL = os.getenv('RESPONSE_CACHE_URL')
+    
+    # Prometheus metrics at /metrics (nginx only proxies /api and /socket.io, so scrape the containers directly)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+    
+    # Development aid: log statement shapes repeated QUERY_INSPECTOR_REPEAT_THRESHOLD times in one
+    # request (likely N+1) and statements slower than QUERY_INSPECTOR_SLOW_MS, with route and caller
+    QUERY_INSPECTOR = os.getenv('QUERY_INSPECTOR', 'False').lower() == 'true'
+    QUERY_INSPECTOR_REPEAT_THRESHOLD = int(os.getenv('QUERY_INSPECTOR_REPEAT_THRESHOLD', 5))
+    QUERY_INSPECTOR_SLOW_MS = int(os.getenv('QUERY_INSPECTOR_SLOW_MS', 100))
+    
+    # Bulk import (POST /api/admin/import and `flask import`): accounts allowed to use the
+    # endpoint, and rows written per transaction
+    ADMIN_EMAILS = [email.strip().lower() for email in os.getenv('ADMIN_EMAILS', '').split(',') if email.strip()]
+    IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 500))
     
     # CORS settings
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*').split(',')
@@ -37,6 +95,21 @@ class Config:
     MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.getenv('MAIL_DEFAULT_SENDER')
 
+def engine_options(url, settings):
+    """SQLAlchemy engine options for the database at `url` from the DB_POOL_* settings."""
+    options = {
+        'pool_pre_ping': settings['DB_POOL_PRE_PING'],
+        'pool_recycle': settings['DB_POOL_RECYCLE']
+    }
+    # SQLite uses a single-connection pool that doesn't take sizing options
+    if not url.startswith('sqlite'):
+        options.update(
+            pool_size=settings['DB_POOL_SIZE'],
+            max_overflow=settings['DB_MAX_OVERFLOW'],
+            pool_timeout=settings['DB_POOL_TIMEOUT']
+        )
+    return options
+
 class DevelopmentConfig(Config):
     DEBUG = True
     TESTING = False
@@ -44,6 +117,7 @@ class DevelopmentConfig(Config):
 class ProductionConfig(Config):
     DEBUG = False
     TESTING = False
+    AUTO_CREATE_TABLES = os.getenv('AUTO_CREATE_TABLES', 'False').lower() == 'true'
 
 class TestingConfig(Config):
     TESTING = True
@@ -0,0 +1,82 @@
+from flask import g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql import Select
+from caching import LRUCache, RedisCache
+from contextlib import contextmanager
+
+# Bind key of the optional read replica in SQLALCHEMY_BINDS
+REPLICA_BIND = 'replica'
+
+# User ids that wrote in the last DATABASE_REPLICA_STICKY_SECONDS, so they read
+# their own writes from the primary until the replica has caught up. Keyed on
+# the JWT identity: the SPA is cross-origin and doesn't send cookies.
+recent_writers = LRUCache()
+
+READ_METHODS = ('GET', 'HEAD')
+
+class RoutingSession(Session):
+    """Session that sends SELECTs to the read replica when the request allows it.
+
+    Reads go to the replica only during GET/HEAD requests whose client hasn't
+    written recently. Once anything in the request writes, every later
+    statement in it goes to the primary too, so a handler always reads its own
+    writes. Outside a request (CLI, background tasks, socket events) everything
+    uses the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or (clause is not None and not isinstance(clause, Select)):
+                g.db_wrote = True
+                g.db_reads_from = 'primary'
+            elif g.get('db_reads_from') == 'replica' and REPLICA_BIND in self._db.engines:
+                return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+@contextmanager
+def use_primary():
+    """Read from the primary inside this block, e.g. when the result will be cached."""
+    previous = g.get('db_reads_from')
+    g.db_reads_from = 'primary'
+    try:
+        yield
+    finally:
+        if not g.get('db_wrote'):
+            g.db_reads_from = previous
+
+def _request_user_id():
+    """The user the request acts for: its JWT identity, or the user a token was just issued to."""
+    if g.get('issued_token_for') is not None:
+        return g.issued_token_for
+    try:
+        verify_jwt_in_request(optional=True)
+    except Exception:
+        # Let the view's own jwt_required report a bad token
+        return None
+    return get_jwt_identity()
+
+def _choose_reads():
+    user_id = _request_user_id()
+    recently_wrote = user_id is not None and recent_writers.get(str(user_id)) is not None
+    g.db_reads_from = 'replica' if request.method in READ_METHODS and not recently_wrote else 'primary'
+
+def _remember_write(response):
+    if g.get('db_wrote'):
+        user_id = _request_user_id()
+        if user_id is not None:
+            recent_writers.set(str(user_id), b'1')
+    return response
+
+def init_db_routing(app):
+    """Route request reads to the replica bind when DATABASE_REPLICA_URL is configured."""
+    global recent_writers
+    if app.config.get('DATABASE_REPLICA_URL'):
+        seconds = app.config.get('DATABASE_REPLICA_STICKY_SECONDS', 5)
+        if app.config.get('DATABASE_REPLICA_STICKY_CACHE_URL'):
+            # Shared, so a write on one replica pins the user's reads on all of them
+            recent_writers = RedisCache(app.config['DATABASE_REPLICA_STICKY_CACHE_URL'], ttl=seconds, prefix='db_wrote:')
+        else:
+            recent_writers = LRUCache(maxsize=app.config.get('DATABASE_REPLICA_STICKY_CACHE_SIZE', 10000), ttl=seconds)
+        app.before_request(_choose_reads)
+        app.after_request(_remember_write)
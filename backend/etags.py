@@ -0,0 +1,22 @@
+from flask import request, make_response
+
+# Responses are per user (JWT protected), so only the browser may store them
+# and it has to revalidate every time
+CACHE_CONTROL = 'private, no-cache'
+
+def tag_response(response, etag):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
+
+def not_modified(etag):
+    """Return a 304 response if the request's If-None-Match already has `etag`, else None."""
+    if request.if_none_match.contains(etag):
+        return tag_response(make_response('', 304), etag)
+    return None
+
+def company_etag(company_id, row_version):
+    return f'company-{company_id}-{row_version}'
+
+def user_etag(user_id, row_version, company_row_version):
+    return f'user-{user_id}-{row_version}-{company_row_version or 0}'
@@ -0,0 +1,55 @@
+from flask import g, has_request_context
+from flask_jwt_extended import create_access_token, get_jwt, get_jwt_identity
+from models import User, Company, db
+from collections import namedtuple
+
+# Who is making the request, as far as authorization needs to know
+Identity = namedtuple('Identity', ['id', 'role', 'company_id'])
+
+def identity_claims(user):
+    return {'role': user.role, 'company_id': user.company_id}
+
+def issue_token(user):
+    """Access token carrying the user's role and company so handlers can authorize without a lookup.
+
+    Issue a fresh token whenever either of them changes.
+    """
+    if has_request_context():
+        # Requests without a token yet (signup, login) still act for this user
+        g.issued_token_for = user.id
+    return create_access_token(identity=user.id, additional_claims=identity_claims(user))
+
+def current_identity():
+    """Identity of the request's user from the JWT claims, built once per request.
+
+    Tokens issued before the claims existed fall back to loading the user.
+    Returns None if such a user no longer exists.
+    """
+    if 'identity' not in g:
+        claims = get_jwt()
+        if 'role' in claims:
+            g.identity = Identity(get_jwt_identity(), claims['role'], claims.get('company_id'))
+        else:
+            user = User.query.get(get_jwt_identity())
+            g.identity = Identity(user.id, user.role, user.company_id) if user else None
+    return g.identity
+
+def owns_company(identity, company_id):
+    """Whether the request's user currently belongs to `company_id`, checked in the database.
+
+    The company_id claim goes stale as soon as a user creates or leaves a
+    company while holding an older token, so it can't grant or refuse writes.
+    """
+    if identity is None:
+        return False
+    return db.session.query(User.company_id).filter_by(id=identity.id).scalar() == company_id
+
+def current_company(identity):
+    """The company the request's user belongs to now, or None, loaded in one query.
+
+    Use it rather than the company_id claim for anything cached per user,
+    since the claim can lag behind the user's actual company.
+    """
+    if identity is None:
+        return None
+    return Company.query.join(User, User.company_id == Company.id).filter(User.id == identity.id).first()
@@ -0,0 +1,35 @@
+from models import Match, conversation_key
+from caching import LRUCache, RedisCache
+
+pair_cache = LRUCache()
+
+def init_pair_cache(app):
+    """Configure the pair cache from CHAT_AUTH_CACHE_* settings."""
+    global pair_cache
+    ttl = app.config.get('CHAT_AUTH_CACHE_TTL', 300)
+    if app.config.get('CHAT_AUTH_CACHE_URL'):
+        pair_cache = RedisCache(app.config['CHAT_AUTH_CACHE_URL'], ttl=ttl, prefix='match_auth:')
+    else:
+        pair_cache = LRUCache(maxsize=app.config.get('CHAT_AUTH_CACHE_SIZE', 10000), ttl=ttl)
+
+def users_are_matched(user_a, user_b):
+    """Whether a Match exists between two users in either direction.
+
+    Only positive answers are cached: matches are never removed, but a pair
+    that isn't matched yet may be matched by a request on any other worker,
+    and a cached "no" would keep refusing it there until the entry expired.
+    """
+    key = conversation_key(user_a, user_b)
+    if pair_cache.get(key) == b'1':
+        return True
+
+    matched = Match.query.filter(
+        ((Match.founder_id == user_a) & (Match.investor_id == user_b)) |
+        ((Match.founder_id == user_b) & (Match.investor_id == user_a))
+    ).first() is not None
+    if matched:
+        pair_cache.set(key, b'1')
+    return matched
+
+def invalidate_pair(user_a, user_b):
+    pair_cache.delete(conversation_key(user_a, user_b))
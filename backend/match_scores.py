@@ -0,0 +1,371 @@
+from models import Company, MatchScore, User, db
+from company_index import invalidate_company_index
+from vector_store import get_company_vectors
+from flask import current_app
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import and_
+from collections import deque
+import math
+import os
+
+# Bump whenever a scoring formula changes so cached rows get recomputed.
+# SCORE_VERSION stamps the original similarity x funding stage formula,
+# MULTI_CRITERIA_SCORE_VERSION the one that also weighs industry and valuation.
+SCORE_VERSION = 1
+MULTI_CRITERIA_SCORE_VERSION = 2
+
+# Extra weight given to an exact industry match and to close valuations
+# when the multi-criteria formula is enabled
+INDUSTRY_MATCH_WEIGHT = 0.1
+VALUATION_FIT_WEIGHT = 0.1
+
+# Candidate pools at least this large are scored with NumPy broadcasting
+# instead of one Python call per candidate
+VECTORIZE_MIN_POOL = 64
+
+# Founder blocks queued or being scored per rebuild worker; bounds how many
+# finished score matrices can wait in memory to be written
+BLOCKS_IN_FLIGHT_PER_WORKER = 2
+
+# Weight applied to the text similarity based on the founder's funding stage
+FUNDING_STAGE_WEIGHTS = {
+    'seed': 1.0,
+    'pre_seed': 0.9,
+    'series_a': 0.8,
+    'series_b': 0.7,
+    'series_c': 0.6,
+    'growth': 0.5
+}
+
+def stage_weight(funding_stage):
+    return FUNDING_STAGE_WEIGHTS.get((funding_stage or '').lower(), 0.5)
+
+def funding_stage_weight(company):
+    """Return the funding stage weight for a founder's company."""
+    return stage_weight(company.funding_stage)
+
+def opposite_role(role):
+    return 'investor' if role == 'founder' else 'founder'
+
+def compat_scoring():
+    """Whether match scores use the original similarity x funding stage formula."""
+    return current_app.config.get('MATCH_SCORE_COMPAT', True)
+
+def score_version(compat=None):
+    if compat is None:
+        compat = compat_scoring()
+    return SCORE_VERSION if compat else MULTI_CRITERIA_SCORE_VERSION
+
+def log_valuation(valuation):
+    """Order of magnitude of a valuation, or NaN if it is missing or not positive."""
+    return math.log1p(valuation) if valuation and valuation > 0 else math.nan
+
+def company_features(companies, compat=False):
+    """Encode the scoring features of `companies` as parallel arrays.
+
+    With `compat` only the funding stage weight is encoded, since the
+    original formula uses nothing else.
+    """
+    import numpy as np
+
+    features = {'stage_weight': np.array([stage_weight(c.funding_stage) for c in companies], dtype=float)}
+    if not compat:
+        features['log_valuation'] = np.array([log_valuation(c.valuation) for c in companies], dtype=float)
+        features['industry'] = np.array([(c.industry or '').lower() for c in companies], dtype=str)
+    return features
+
+def combine_scores(similarities, founders, investors, compat=True):
+    """Combine a (founders x investors) similarity matrix with company features.
+
+    `founders` and `investors` are `company_features` dicts whose lengths match
+    the rows and columns of `similarities`. With `compat` the result is exactly
+    similarity x funding stage weight.
+    """
+    import numpy as np
+    
+    scores = similarities * founders['stage_weight'][:, None]
+    if compat:
+        return scores
+    
+    founder_industry = founders['industry'][:, None]
+    industry_match = (founder_industry == investors['industry'][None, :]) & (founder_industry != '')
+    
+    # Valuations closer in order of magnitude fit better; missing valuations don't count
+    valuation_gap = np.abs(founders['log_valuation'][:, None] - investors['log_valuation'][None, :])
+    valuation_fit = np.nan_to_num(np.exp(-valuation_gap))
+    
+    return scores + INDUSTRY_MATCH_WEIGHT * industry_match + VALUATION_FIT_WEIGHT * valuation_fit
+
+def _score_pair(similarity, founder_company, investor_company, compat=True):
+    """Scalar counterpart of `combine_scores` for a single pair."""
+    score = similarity * funding_stage_weight(founder_company)
+    if compat:
+        return score
+    
+    founder_industry = (founder_company.industry or '').lower()
+    if founder_industry and founder_industry == (investor_company.industry or '').lower():
+        score += INDUSTRY_MATCH_WEIGHT
+    
+    valuation_gap = abs(log_valuation(founder_company.valuation) - log_valuation(investor_company.valuation))
+    if not math.isnan(valuation_gap):
+        score += VALUATION_FIT_WEIGHT * math.exp(-valuation_gap)
+    
+    return score
+
+def score_pairs(company, role, candidate_companies, compat=None, vectors=None):
+    """Score `company`, owned by a user with `role`, against companies on the other side.
+
+    Pools of at least VECTORIZE_MIN_POOL candidates are combined with NumPy
+    broadcasting; smaller pools go through the scalar formula. Similarities
+    come from `vectors`, by default the current `get_company_vectors()`.
+    Returns a list of floats aligned with `candidate_companies`.
+    """
+    if compat is None:
+        compat = compat_scoring()
+    if vectors is None:
+        vectors = get_company_vectors()
+    
+    similarities = vectors.similarities(company, candidate_companies)
+    
+    if len(candidate_companies) < VECTORIZE_MIN_POOL:
+        if role == 'founder':
+            return [_score_pair(sim, company, c, compat) for sim, c in zip(similarities, candidate_companies)]
+        return [_score_pair(sim, c, company, compat) for sim, c in zip(similarities, candidate_companies)]
+    
+    own = company_features([company], compat)
+    others = company_features(candidate_companies, compat)
+    
+    if role == 'founder':
+        return combine_scores(similarities[None, :], own, others, compat)[0].tolist()
+    return combine_scores(similarities[:, None], others, own, compat)[:, 0].tolist()
+
+def _score_columns(role):
+    """Return the (own, other) MatchScore company columns for a user with `role`."""
+    if role == 'founder':
+        return MatchScore.founder_company_id, MatchScore.investor_company_id
+    return MatchScore.investor_company_id, MatchScore.founder_company_id
+
+def _row(company_id, other_company_id, role, score, version, vectors_version):
+    if role == 'founder':
+        founder_company_id, investor_company_id = company_id, other_company_id
+    else:
+        founder_company_id, investor_company_id = other_company_id, company_id
+    return {
+        'founder_company_id': founder_company_id,
+        'investor_company_id': investor_company_id,
+        'score': score,
+        'version': version,
+        'vectors_version': vectors_version
+    }
+
+def _upsert_scores(rows):
+    """Insert score rows, overwriting any that a concurrent request wrote first. Does not commit."""
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    statement = insert(MatchScore)
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=[MatchScore.founder_company_id, MatchScore.investor_company_id],
+        set_={
+            'score': statement.excluded.score,
+            'version': statement.excluded.version,
+            'vectors_version': statement.excluded.vectors_version,
+            'computed_at': statement.excluded.computed_at
+        }
+    ), rows)
+
+def ensure_scores(company, role):
+    """Compute and store scores for every opposite-role company without a current row.
+
+    A row is current when it was computed with this score version from the
+    vectors in use now (the same TF-IDF fit or vector build); rows from older
+    fits or builds aren't comparable and are recomputed. Once the cache is
+    warm this is a single anti-join. Returns the version of the vectors used,
+    for `top_matches`.
+    """
+    own, other = _score_columns(role)
+    compat = compat_scoring()
+    version = score_version(compat)
+    vectors = get_company_vectors()
+
+    candidate_company_ids = db.session.query(User.company_id).filter(
+        User.role == opposite_role(role),
+        User.company_id.isnot(None)
+    )
+    missing = Company.query.outerjoin(MatchScore, and_(
+        own == company.id,
+        other == Company.id,
+        MatchScore.version == version,
+        MatchScore.vectors_version == vectors.version
+    )).filter(
+        Company.id.in_(candidate_company_ids),
+        MatchScore.score.is_(None)
+    ).all()
+
+    if not missing:
+        return vectors.version
+
+    scores = score_pairs(company, role, missing, compat, vectors)
+
+    # Drop rows left behind by another scoring version or set of vectors before inserting
+    MatchScore.query.filter(
+        own == company.id,
+        (MatchScore.version != version) | (MatchScore.vectors_version != vectors.version)
+    ).delete(synchronize_session=False)
+    _upsert_scores([
+        _row(company.id, candidate.id, role, score, version, vectors.version)
+        for candidate, score in zip(missing, scores)
+    ])
+    db.session.commit()
+    return vectors.version
+
+def top_matches(company, role, exclude_user_ids=(), threshold=0.0, limit=10, vectors_version=None):
+    """Return (user, score) pairs for the best scoring opposite-role users.
+
+    Reads straight from the MatchScore table, so `ensure_scores` should have been
+    called for `company` first; pass on the vectors version it returned.
+    """
+    own, other = _score_columns(role)
+    if vectors_version is None:
+        vectors_version = get_company_vectors().version
+
+    query = db.session.query(User, MatchScore.score).join(
+        MatchScore, other == User.company_id
+    ).filter(
+        own == company.id,
+        MatchScore.version == score_version(),
+        MatchScore.vectors_version == vectors_version,
+        MatchScore.score > threshold,
+        User.role == opposite_role(role)
+    )
+
+    if exclude_user_ids:
+        query = query.filter(User.id.notin_(exclude_user_ids))
+
+    return query.order_by(MatchScore.score.desc(), User.id).limit(limit).all()
+
+def pair_score(founder_company, investor_company):
+    """Return the stored score for a pair, computing and storing it if missing.
+
+    The new row is written in the current transaction but not committed.
+    """
+    version = score_version()
+    vectors = get_company_vectors()
+    row = db.session.get(MatchScore, (founder_company.id, investor_company.id))
+    if row and row.version == version and row.vectors_version == vectors.version:
+        return row.score
+
+    score = score_pairs(founder_company, 'founder', [investor_company], vectors=vectors)[0]
+    _upsert_scores([_row(founder_company.id, investor_company.id, 'founder', score, version, vectors.version)])
+    return score
+
+def invalidate_company_scores(company_id):
+    """Delete every cached score involving a company. Does not commit."""
+    MatchScore.query.filter(
+        (MatchScore.founder_company_id == company_id) |
+        (MatchScore.investor_company_id == company_id)
+    ).delete(synchronize_session=False)
+
+# Investor vectors and features shared by every block a rebuild worker scores
+_worker_state = {}
+
+def _init_rebuild_worker(investor_matrix, investor_features, compat):
+    _worker_state.update(matrix=investor_matrix, features=investor_features, compat=compat)
+
+def _score_block(founder_matrix, founder_features):
+    """Score a block of founder vectors against every investor vector."""
+    from scipy import sparse
+
+    similarities = founder_matrix @ _worker_state['matrix'].T
+    if sparse.issparse(similarities):
+        similarities = similarities.toarray()
+    return combine_scores(similarities, founder_features, _worker_state['features'], _worker_state['compat'])
+
+def _company_ids_for_role(role):
+    return [company_id for (company_id,) in db.session.query(User.company_id).filter(
+        User.role == role,
+        User.company_id.isnot(None)
+    ).distinct().order_by(User.company_id)]
+
+def rebuild_scores(workers=None, chunk_size=256, resume=False):
+    """Recompute the full founder x investor score matrix into MatchScore.
+
+    Vectors come from the published vector store when there is one, otherwise
+    from a freshly fit TF-IDF index. Founder companies are split into blocks of `chunk_size` and scored across a
+    process pool. Each block is written and committed on its own, so an
+    interrupted run can be continued with `resume=True`, which skips founder
+    companies that already have a current row for every investor company.
+
+    Yields (founder_companies_done, founder_companies_total, pairs_written)
+    after each block is committed.
+    """
+    invalidate_company_index()
+    index = get_company_vectors()
+    compat = compat_scoring()
+    version = score_version(compat)
+
+    founder_ids = _company_ids_for_role('founder')
+    investor_ids = _company_ids_for_role('investor')
+
+    if index.matrix is None or not founder_ids or not investor_ids:
+        return
+
+    if resume:
+        complete = {
+            company_id for company_id, count in db.session.query(
+                MatchScore.founder_company_id, db.func.count()
+            ).filter(
+                MatchScore.version == version,
+                MatchScore.vectors_version == index.version
+            ).group_by(MatchScore.founder_company_id)
+            if count == len(investor_ids)
+        }
+        founder_ids = [i for i in founder_ids if i not in complete]
+
+    # Whole rows: companies edited since the vectors were built are scored from their text
+    companies = {company.id: company for company in Company.query}
+    investor_matrix = index.vectors([companies[i] for i in investor_ids])
+    blocks = iter([founder_ids[i:i + chunk_size] for i in range(0, len(founder_ids), chunk_size)])
+    in_flight = (workers or os.cpu_count() or 1) * BLOCKS_IN_FLIGHT_PER_WORKER
+
+    def submit(executor, block):
+        return executor.submit(
+            _score_block,
+            index.vectors([companies[i] for i in block]),
+            company_features([companies[i] for i in block], compat)
+        )
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_rebuild_worker,
+        initargs=(investor_matrix, company_features([companies[i] for i in investor_ids], compat), compat)
+    ) as executor:
+        # Build and submit blocks as earlier ones are written, so finished score
+        # matrices don't pile up in memory ahead of the database
+        pending = deque()
+        done = 0
+        while True:
+            while len(pending) < in_flight:
+                block = next(blocks, None)
+                if block is None:
+                    break
+                pending.append((block, submit(executor, block)))
+            if not pending:
+                break
+
+            block, future = pending.popleft()
+            scores = future.result()
+            MatchScore.query.filter(
+                MatchScore.founder_company_id.in_(block)
+            ).delete(synchronize_session=False)
+            db.session.execute(db.insert(MatchScore), [
+                _row(founder_id, investor_id, 'founder', float(scores[r, c]), version, index.version)
+                for r, founder_id in enumerate(block)
+                for c, investor_id in enumerate(investor_ids)
+            ])
+            db.session.commit()
+
+            done += len(block)
+            yield done, len(founder_ids), len(block) * len(investor_ids)
@@ -0,0 +1,145 @@
+from flask import current_app
+from app import socketio
+from models import Message, db
+from metrics import MESSAGE_BATCH_FLUSH, MESSAGE_BATCH_SIZE
+import logging
+import threading
+import time
+
+# How long the flusher waits for more messages before committing a batch,
+# and the most messages written in one transaction
+GROUP_COMMIT_WINDOW = 0.005
+GROUP_COMMIT_MAX_BATCH = 200
+
+# Seconds a handler waits for its message to be written before acking an error
+SUBMIT_TIMEOUT = 10
+
+logger = logging.getLogger(__name__)
+
+def message_payload(message):
+    return {
+        'id': message['id'],
+        'sender_id': message['sender_id'],
+        'receiver_id': message['receiver_id'],
+        'content': message['content'],
+        'created_at': message['created_at'].isoformat()
+    }
+
+class MessageBatcher:
+    """Group commit for chat messages sent over the socket.
+
+    Handlers call `submit`, which queues the message and blocks until a
+    background flusher has written it. The flusher waits GROUP_COMMIT_WINDOW
+    for more messages to arrive, inserts everything queued in one transaction,
+    emits `new_message` to each room and then wakes the waiting handlers.
+    Every handler is woken even if the flush fails, and a flusher that dies
+    is restarted by the next `submit`.
+    """
+
+    def __init__(self, window=GROUP_COMMIT_WINDOW, max_batch=GROUP_COMMIT_MAX_BATCH):
+        self.window = window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._pending = []
+        self._wakeup = None
+        self._started = False
+
+    def submit(self, sender_id, receiver_id, content, timeout=None):
+        """Queue a message and return its payload once committed.
+
+        Raises if the flush failed, or TimeoutError if the message wasn't
+        written within `timeout` seconds (SUBMIT_TIMEOUT by default).
+        """
+        entry = {
+            'row': {'sender_id': sender_id, 'receiver_id': receiver_id, 'content': content},
+            'done': socketio.server.eio.create_event(),
+            'result': None,
+            'error': None
+        }
+
+        with self._lock:
+            if not self._started:
+                # First use, or the flusher died: start a new one
+                self._wakeup = self._wakeup or socketio.server.eio.create_event()
+                socketio.start_background_task(self._run, current_app._get_current_object())
+                self._started = True
+            self._pending.append(entry)
+            self._wakeup.set()
+
+        if not entry['done'].wait(SUBMIT_TIMEOUT if timeout is None else timeout):
+            with self._lock:
+                if entry in self._pending:
+                    # Never picked up, so it will never be written either
+                    self._pending.remove(entry)
+                    raise TimeoutError('Timed out waiting to save the message')
+            raise TimeoutError('Timed out waiting to save the message; it may still be delivered')
+        if entry['error'] is not None:
+            raise entry['error']
+        return entry['result']
+
+    def _run(self, app):
+        try:
+            while True:
+                self._wakeup.wait()
+                socketio.sleep(self.window)
+
+                with self._lock:
+                    batch, self._pending = self._pending, []
+                    self._wakeup.clear()
+
+                # A failing batch must not take the flusher down with it
+                for start in range(0, len(batch), self.max_batch):
+                    chunk = batch[start:start + self.max_batch]
+                    try:
+                        with app.app_context():
+                            self._flush(chunk)
+                    except Exception as e:
+                        logger.exception('Message batch flush failed')
+                        for entry in chunk:
+                            if entry['result'] is None and entry['error'] is None:
+                                entry['error'] = e
+                    finally:
+                        for entry in chunk:
+                            entry['done'].set()
+        finally:
+            # Let the next submit start a new flusher; anything still queued is picked up by it
+            with self._lock:
+                self._started = False
+
+    def _flush(self, batch):
+        """Write `batch` in one transaction and emit each message to its room.
+
+        Entries get a result or an error; the caller wakes them.
+        """
+        started = time.perf_counter()
+        try:
+            rows = db.session.execute(
+                db.insert(Message).returning(
+                    Message.id, Message.created_at, Message.conversation_key,
+                    sort_by_parameter_order=True
+                ),
+                [entry['row'] for entry in batch]
+            ).all()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            for entry in batch:
+                entry['error'] = e
+            return
+        finally:
+            db.session.remove()
+
+        for entry, (message_id, created_at, key) in zip(batch, rows):
+            entry['result'] = message_payload(dict(entry['row'], id=message_id, created_at=created_at))
+
+        # The messages are saved either way; a failed emit only costs the live update
+        for entry, (_, _, key) in zip(batch, rows):
+            try:
+                socketio.emit('new_message', entry['result'], room=f"chat_{key}")
+            except Exception:
+                logger.exception('Emitting new_message to chat_%s failed', key)
+
+        MESSAGE_BATCH_SIZE.observe((), len(batch))
+        MESSAGE_BATCH_FLUSH.observe((), time.perf_counter() - started)
+
+message_batcher = MessageBatcher()
@@ -0,0 +1,200 @@
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from functools import wraps
+import threading
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition format."""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts (plus +Inf), sum
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            else:
+                series[0][-1] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else _format_value(bound)
+                    lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, [("le", le)])} {cumulative}')
+                lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}')
+                lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency.', ('blueprint', 'endpoint', 'method')
+)
+REQUESTS = Counter(
+    'http_requests_total', 'HTTP requests by response status.', ('blueprint', 'endpoint', 'method', 'status')
+)
+REQUEST_SQL_STATEMENTS = Histogram(
+    'http_request_sql_statements', 'SQL statements executed per HTTP request.', ('blueprint', 'endpoint'), COUNT_BUCKETS
+)
+REQUEST_SQL_SECONDS = Histogram(
+    'http_request_sql_seconds', 'Time spent in SQL per HTTP request.', ('blueprint', 'endpoint')
+)
+EVENT_LATENCY = Histogram(
+    'socketio_event_duration_seconds', 'Socket.IO event handler latency.', ('event',)
+)
+EVENT_SQL_STATEMENTS = Histogram(
+    'socketio_event_sql_statements', 'SQL statements executed per Socket.IO event.', ('event',), COUNT_BUCKETS
+)
+MESSAGE_BATCH_FLUSH = Histogram(
+    'chat_message_batch_flush_seconds', 'Time to insert and emit one batch of chat messages.'
+)
+MESSAGE_BATCH_SIZE = Histogram(
+    'chat_message_batch_size', 'Chat messages written per batch.', buckets=COUNT_BUCKETS
+)
+
+METRICS = [
+    REQUEST_LATENCY, REQUESTS, REQUEST_SQL_STATEMENTS, REQUEST_SQL_SECONDS,
+    EVENT_LATENCY, EVENT_SQL_STATEMENTS, MESSAGE_BATCH_FLUSH, MESSAGE_BATCH_SIZE
+]
+
+def _cache_lines():
+    """Hit/miss/size counters of the in-process caches, read at scrape time."""
+    from match_auth import pair_cache
+    from response_cache import response_cache
+
+    caches = {'chat_auth': pair_cache, 'response_local': response_cache.local}
+    if response_cache.shared is not None:
+        caches['response_shared'] = response_cache.shared
+
+    lines = []
+    for stat, kind, documentation in [
+        ('hits', 'counter', 'Cache hits.'),
+        ('misses', 'counter', 'Cache misses.'),
+        ('size', 'gauge', 'Entries held in process.')
+    ]:
+        name = f'cache_{stat}_total' if kind == 'counter' else f'cache_{stat}'
+        lines += [f'# HELP {name} {documentation}', f'# TYPE {name} {kind}']
+        for cache_name, cache in caches.items():
+            stats = cache.stats()
+            if stat in stats:
+                lines.append(f'{name}{{cache="{cache_name}"}} {stats[stat]}')
+    return lines
+
+def render_metrics():
+    lines = []
+    for metric in METRICS:
+        lines += metric.render()
+    lines += _cache_lines()
+    return '\n'.join(lines) + '\n'
+
+# SQL statement counts and time accumulate on `g` for the current request or
+# socket event; statements outside one (CLI, background tasks) aren't counted.
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.sql_statements = g.get('sql_statements', 0) + 1
+        g.sql_seconds = g.get('sql_seconds', 0.0) + time.perf_counter() - context._metrics_started
+
+def _start_request():
+    g.request_started = time.perf_counter()
+
+def _record_request(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    endpoint = request.endpoint or 'unmatched'
+    blueprint = request.blueprint or ''
+    REQUEST_LATENCY.observe((blueprint, endpoint, request.method), time.perf_counter() - started)
+    REQUESTS.inc((blueprint, endpoint, request.method, str(response.status_code)))
+    REQUEST_SQL_STATEMENTS.observe((blueprint, endpoint), g.get('sql_statements', 0))
+    REQUEST_SQL_SECONDS.observe((blueprint, endpoint), g.get('sql_seconds', 0.0))
+    return response
+
+def timed_event(name):
+    """Record latency and SQL statements of a Socket.IO event handler."""
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(*args, **kwargs):
+            g.sql_statements = 0
+            started = time.perf_counter()
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                EVENT_LATENCY.observe((name,), time.perf_counter() - started)
+                EVENT_SQL_STATEMENTS.observe((name,), g.get('sql_statements', 0))
+        return wrapper
+    return decorator
+
+def metrics_view():
+    return Response(render_metrics(), content_type=CONTENT_TYPE)
+
+_sql_hooks_installed = False
+
+def init_metrics(app):
+    """Install the request and SQL hooks and serve /metrics when METRICS_ENABLED is set."""
+    global _sql_hooks_installed
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    if not _sql_hooks_installed:
+        # Engine-wide, so the primary and any replica bind are both counted
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _sql_hooks_installed = True
+
+    app.before_request(_start_request)
+    app.after_request(_record_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -0,0 +1,59 @@
+"""user full-text search index
+
+Revision ID: 5b9e13a7d402
+Revises: c27d9e4f0b61
+Create Date: 2026-10-18 16:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b9e13a7d402'
+down_revision = 'c27d9e4f0b61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute("CREATE VIRTUAL TABLE user_fts USING fts5(name, bio, content='user', content_rowid='id')")
+        op.execute(
+            'CREATE TRIGGER user_fts_ai AFTER INSERT ON "user" BEGIN '
+            "INSERT INTO user_fts(rowid, name, bio) VALUES (new.id, new.name, new.bio); END"
+        )
+        op.execute(
+            'CREATE TRIGGER user_fts_ad AFTER DELETE ON "user" BEGIN '
+            "INSERT INTO user_fts(user_fts, rowid, name, bio) VALUES ('delete', old.id, old.name, old.bio); END"
+        )
+        op.execute(
+            'CREATE TRIGGER user_fts_au AFTER UPDATE OF name, bio ON "user" BEGIN '
+            "INSERT INTO user_fts(user_fts, rowid, name, bio) VALUES ('delete', old.id, old.name, old.bio); "
+            "INSERT INTO user_fts(rowid, name, bio) VALUES (new.id, new.name, new.bio); END"
+        )
+        # Index the users that already exist
+        op.execute("INSERT INTO user_fts(user_fts) VALUES ('rebuild')")
+
+    elif dialect == 'postgresql':
+        op.execute(
+            'ALTER TABLE "user" ADD COLUMN search_vector tsvector GENERATED ALWAYS AS '
+            "(to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(bio, ''))) STORED"
+        )
+        op.execute('CREATE INDEX ix_user_search_vector ON "user" USING GIN (search_vector)')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute('DROP TRIGGER user_fts_au')
+        op.execute('DROP TRIGGER user_fts_ad')
+        op.execute('DROP TRIGGER user_fts_ai')
+        op.execute('DROP TABLE user_fts')
+
+    elif dialect == 'postgresql':
+        op.execute('DROP INDEX ix_user_search_vector')
+        op.execute('ALTER TABLE "user" DROP COLUMN search_vector')
@@ -0,0 +1,39 @@
+"""message conversation key and history index
+
+Revision ID: 8a4e6d21c5f3
+Revises: 3f1c2a9b7d10
+Create Date: 2026-10-18 15:35:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4e6d21c5f3'
+down_revision = '3f1c2a9b7d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('message', sa.Column('conversation_key', sa.String(length=50), nullable=True))
+
+    # Backfill existing rows with "<lower user id>_<higher user id>"
+    op.execute(
+        "UPDATE message SET conversation_key = CASE "
+        "WHEN sender_id < receiver_id "
+        "THEN CAST(sender_id AS VARCHAR(20)) || '_' || CAST(receiver_id AS VARCHAR(20)) "
+        "ELSE CAST(receiver_id AS VARCHAR(20)) || '_' || CAST(sender_id AS VARCHAR(20)) END"
+    )
+
+    with op.batch_alter_table('message') as batch_op:
+        batch_op.alter_column('conversation_key', existing_type=sa.String(length=50), nullable=False)
+
+    op.create_index('ix_message_conversation', 'message', ['conversation_key', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_message_conversation', table_name='message')
+    with op.batch_alter_table('message') as batch_op:
+        batch_op.drop_column('conversation_key')
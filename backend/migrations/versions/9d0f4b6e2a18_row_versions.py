@@ -0,0 +1,27 @@
+"""user and company row versions
+
+Revision ID: 9d0f4b6e2a18
+Revises: 5b9e13a7d402
+Create Date: 2026-10-18 16:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d0f4b6e2a18'
+down_revision = '5b9e13a7d402'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Plain ADD COLUMN; recreating "user" on SQLite would drop its search triggers
+    op.add_column('company', sa.Column('row_version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('user', sa.Column('row_version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    op.drop_column('user', 'row_version')
+    op.drop_column('company', 'row_version')
@@ -0,0 +1,26 @@
+"""message sender and receiver indexes
+
+Revision ID: c27d9e4f0b61
+Revises: 8a4e6d21c5f3
+Create Date: 2026-10-18 15:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c27d9e4f0b61'
+down_revision = '8a4e6d21c5f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(op.f('ix_message_receiver_id'), 'message', ['receiver_id'], unique=False)
+    op.create_index(op.f('ix_message_sender_id'), 'message', ['sender_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_message_sender_id'), table_name='message')
+    op.drop_index(op.f('ix_message_receiver_id'), table_name='message')
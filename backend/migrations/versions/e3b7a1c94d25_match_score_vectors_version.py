@@ -0,0 +1,25 @@
+"""match score vectors version
+
+Revision ID: e3b7a1c94d25
+Revises: 9d0f4b6e2a18
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b7a1c94d25'
+down_revision = '9d0f4b6e2a18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows match no fit or build, so they are recomputed on next use
+    op.add_column('match_score', sa.Column('vectors_version', sa.String(length=64), server_default='', nullable=False))
+
+
+def downgrade():
+    op.drop_column('match_score', 'vectors_version')
@@ -1,6 +1,16 @@
 from app import db
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+from passwords import hash_password, verify_password, needs_rehash
+
+def conversation_key(user_a, user_b):
+    """Canonical key for the conversation between two users, independent of direction."""
+    return f"{min(int(user_a), int(user_b))}_{max(int(user_a), int(user_b))}"
+
+def _message_conversation_key(context):
+    params = context.get_current_parameters()
+    return conversation_key(params['sender_id'], params['receiver_id'])
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -11,6 +21,7 @@ class User(db.Model):
     bio = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     company_id = db.Column(db.Integer, db.ForeignKey('company.id'))
+    row_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # bumped on every update, used for ETags
     
     # Relationships
     company = db.relationship('Company', backref='users')
@@ -18,10 +29,13 @@ class User(db.Model):
     received_messages = db.relationship('Message', backref='receiver', foreign_keys='Message.receiver_id')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        return needs_rehash(self.password_hash)
 
 class Company(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -31,11 +45,26 @@ class Company(db.Model):
     funding_stage = db.Column(db.String(50))
     valuation = db.Column(db.Float)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    row_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # bumped on every update, used for ETags
     
     # Relationships
     funding_rounds = db.relationship('FundingRound', backref='company', lazy=True)
     projects = db.relationship('Project', backref='company', lazy=True)
 
+@event.listens_for(User, 'before_update')
+@event.listens_for(Company, 'before_update')
+def _bump_row_version(mapper, connection, target):
+    # Only bump for real column changes, not relationship-only flushes
+    if object_session(target).is_modified(target, include_collections=False):
+        target.row_version = type(target).row_version + 1
+
+def touch_company(company_id):
+    """Bump a company's row version when something shown on its page changes elsewhere."""
+    if company_id:
+        db.session.execute(
+            db.update(Company).where(Company.id == company_id).values(row_version=Company.row_version + 1)
+        )
+
 class FundingRound(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=False)
@@ -62,11 +91,16 @@ class ProjectCollaborator(db.Model):
 
 class Message(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    sender_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    receiver_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    sender_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    receiver_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     read = db.Column(db.Boolean, default=False)
+    conversation_key = db.Column(db.String(50), nullable=False, default=_message_conversation_key)
+    
+    __table_args__ = (
+        db.Index('ix_message_conversation', 'conversation_key', 'created_at', 'id'),
+    )
 
 class Match(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -78,4 +112,18 @@ class Match(db.Model):
     
     # Relationships
     founder = db.relationship('User', foreign_keys=[founder_id])
-    investor = db.relationship('User', foreign_keys=[investor_id]) 
\ No newline at end of file
+    investor = db.relationship('User', foreign_keys=[investor_id])
+
+class MatchScore(db.Model):
+    """Cached match score for a founder company / investor company pair."""
+    founder_company_id = db.Column(db.Integer, db.ForeignKey('company.id'), primary_key=True)
+    investor_company_id = db.Column(db.Integer, db.ForeignKey('company.id'), primary_key=True)
+    score = db.Column(db.Float, nullable=False)
+    version = db.Column(db.Integer, nullable=False)  # scoring formula version the row was computed with
+    vectors_version = db.Column(db.String(64), nullable=False, server_default='')  # TF-IDF fit or vector build behind the similarity
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_match_score_founder_score', 'founder_company_id', 'score'),
+        db.Index('ix_match_score_investor_score', 'investor_company_id', 'score'),
+    )
@@ -0,0 +1,80 @@
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+import sys
+
+try:
+    import bcrypt
+except ImportError:  # pragma: no cover - bcrypt is optional
+    bcrypt = None
+
+# Cost used when PASSWORD_HASH_COST isn't set: iterations for PBKDF2, N for
+# scrypt and log2 rounds for bcrypt. The PBKDF2 default matches werkzeug's, so
+# hashes made before these settings existed don't need rehashing.
+DEFAULT_COSTS = {
+    'pbkdf2:sha256': 600000,
+    'pbkdf2:sha512': 600000,
+    'scrypt': 32768,
+    'bcrypt': 12
+}
+
+def offload(fn, *args):
+    """Call a CPU-bound `fn` on a native thread when running under eventlet.
+
+    Hashing a password takes hundreds of milliseconds; run on the hub it would
+    stall every socket and request the worker is serving.
+    """
+    # Only a process that already imported eventlet can have been monkey-patched
+    patcher = sys.modules.get('eventlet.patcher')
+    if patcher is not None and patcher.is_monkey_patched('thread'):
+        from eventlet import tpool
+        return tpool.execute(fn, *args)
+    return fn(*args)
+
+def hash_settings():
+    """The configured (algorithm, cost)."""
+    algorithm = current_app.config.get('PASSWORD_HASH_ALGORITHM', 'pbkdf2:sha256')
+    if algorithm not in DEFAULT_COSTS:
+        raise ValueError(f'Unsupported password hash algorithm: {algorithm}')
+    return algorithm, current_app.config.get('PASSWORD_HASH_COST') or DEFAULT_COSTS[algorithm]
+
+def _werkzeug_method(algorithm, cost):
+    if algorithm == 'scrypt':
+        return f'scrypt:{cost}:8:1'
+    return f'{algorithm}:{cost}'
+
+def _hash(password, algorithm, cost):
+    if algorithm == 'bcrypt':
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=cost)).decode()
+    return generate_password_hash(password, method=_werkzeug_method(algorithm, cost))
+
+def _verify(password_hash, password):
+    if password_hash.startswith('$2'):
+        return bcrypt.checkpw(password.encode(), password_hash.encode())
+    return check_password_hash(password_hash, password)
+
+def hash_password(password):
+    algorithm, cost = hash_settings()
+    return offload(_hash, password, algorithm, cost)
+
+def verify_password(password_hash, password):
+    return offload(_verify, password_hash, password)
+
+def needs_rehash(password_hash):
+    """Whether a stored hash was made with a different algorithm or cost than configured."""
+    algorithm, cost = hash_settings()
+    if algorithm == 'bcrypt':
+        # $2b$<rounds>$<salt and hash>
+        return not password_hash.startswith(f'$2b${cost:02d}$')
+    return password_hash.split('$', 1)[0] != _werkzeug_method(algorithm, cost)
+
+def hash_passwords(passwords, workers=8):
+    """Hash many passwords concurrently, for bulk imports; returns the hashes in order.
+
+    The hashing libraries release the GIL, so native threads run in parallel;
+    under eventlet the threads are green and each hands its hash to tpool.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    algorithm, cost = hash_settings()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda password: offload(_hash, password, algorithm, cost), passwords))
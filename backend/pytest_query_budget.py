@@ -0,0 +1,44 @@
+"""Pytest plugin that fails a test when a request it makes runs too many SQL statements.
+
+Load it with ``pytest -p pytest_query_budget`` (or ``pytest_plugins`` in a
+conftest) from the backend directory, then declare a budget per test:
+
+    @pytest.mark.query_budget(2)
+    def test_get_user(client, auth_headers):
+        client.get('/api/users/1', headers=auth_headers)
+
+Every request made during the test is checked against the budget, and the
+failure lists the statement shapes that repeated.
+"""
+import pytest
+from query_inspector import record_requests, repeated_statements
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers',
+        'query_budget(n): fail if any request made by the test executes more than n SQL statements'
+    )
+
+def _describe(queries):
+    lines = [f'{queries.method} {queries.path} ({queries.endpoint}) ran {len(queries.statements)} statements']
+    for count, statement in repeated_statements(queries.statements, 2):
+        lines.append(f'  {count} x {statement.fingerprint}\n      first issued at {statement.frame}')
+    return '\n'.join(lines)
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    marker = item.get_closest_marker('query_budget')
+    if marker is None:
+        return (yield)
+
+    budget = marker.args[0]
+    with record_requests() as recorded:
+        result = yield
+
+    over = [queries for queries in recorded if len(queries.statements) > budget]
+    if over:
+        pytest.fail(
+            f'Query budget of {budget} exceeded:\n' + '\n'.join(_describe(queries) for queries in over),
+            pytrace=False
+        )
+    return result
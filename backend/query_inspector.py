@@ -0,0 +1,129 @@
+from flask import current_app, g, has_request_context, request, request_started, request_finished
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+import logging
+import os
+import re
+import sysconfig
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Frames from these are skipped when looking for the code that issued a statement
+LIBRARY_PATHS = tuple({
+    os.path.abspath(sysconfig.get_paths()[name]) for name in ('stdlib', 'platstdlib', 'purelib', 'platlib')
+})
+
+Statement = namedtuple('Statement', ['fingerprint', 'sql', 'seconds', 'frame'])
+RequestQueries = namedtuple('RequestQueries', ['method', 'path', 'endpoint', 'statements'])
+
+# Literals and placeholder lists that vary between otherwise identical statements
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\((?:\s*(?:\?|%\([^)]*\)s|%s|:\w+)\s*,)+\s*(?:\?|%\([^)]*\)s|%s|:\w+)\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+def fingerprint(sql):
+    """Shape of a statement: literals become ?, IN lists collapse and whitespace is normalised."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER_LIST.sub('(?)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+def _caller_frame():
+    """The innermost frame outside the standard library and installed packages, as 'file:line in function'."""
+    for frame in reversed(traceback.extract_stack()):
+        # Skip code generated at runtime, e.g. SQLAlchemy's decorator wrappers
+        if frame.filename.startswith('<'):
+            continue
+        filename = os.path.abspath(frame.filename)
+        if not filename.startswith(LIBRARY_PATHS) and filename != os.path.abspath(__file__):
+            path = os.path.relpath(filename, APP_ROOT) if filename.startswith(APP_ROOT) else filename
+            return f'{path}:{frame.lineno} in {frame.name}'
+    return 'unknown'
+
+def repeated_statements(statements, threshold):
+    """(count, first Statement) for each statement shape issued at least `threshold` times."""
+    counts = Counter(statement.fingerprint for statement in statements)
+    first = {}
+    for statement in statements:
+        first.setdefault(statement.fingerprint, statement)
+    return [
+        (count, first[shape]) for shape, count in counts.most_common() if count >= threshold
+    ]
+
+# Lists receiving a RequestQueries for every request while record_requests() is active
+_recorders = []
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._inspector_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context() or 'query_log' not in g:
+        return
+    seconds = time.perf_counter() - context._inspector_started
+    frame = _caller_frame()
+    g.query_log.append(Statement(fingerprint(statement), statement, seconds, frame))
+
+    slow_ms = current_app.config.get('QUERY_INSPECTOR_SLOW_MS')
+    if current_app.config.get('QUERY_INSPECTOR') and slow_ms and seconds * 1000 >= slow_ms:
+        logger.warning(
+            'Slow query (%.1f ms) in %s %s at %s: %s',
+            seconds * 1000, request.method, request.path, frame, _WHITESPACE.sub(' ', statement)
+        )
+
+def _on_request_started(sender, **extra):
+    if sender.config.get('QUERY_INSPECTOR') or _recorders:
+        g.query_log = []
+
+def _on_request_finished(sender, response, **extra):
+    statements = g.pop('query_log', None)
+    if statements is None:
+        return
+    queries = RequestQueries(request.method, request.path, request.endpoint, statements)
+
+    if sender.config.get('QUERY_INSPECTOR'):
+        for count, statement in repeated_statements(statements, sender.config.get('QUERY_INSPECTOR_REPEAT_THRESHOLD', 5)):
+            logger.warning(
+                'Possible N+1 in %s %s (%s): %d x %s\n  first issued at %s',
+                queries.method, queries.path, queries.endpoint, count, statement.fingerprint, statement.frame
+            )
+
+    for recorder in _recorders:
+        recorder.append(queries)
+
+_installed = False
+
+def _install():
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    request_started.connect(_on_request_started)
+    request_finished.connect(_on_request_finished)
+    _installed = True
+
+def init_query_inspector(app):
+    """Log repeated statement shapes and slow queries per request when QUERY_INSPECTOR is set.
+
+    Meant for development: it captures a stack for every statement.
+    """
+    if app.config.get('QUERY_INSPECTOR'):
+        _install()
+
+@contextmanager
+def record_requests():
+    """Collect a RequestQueries for every request handled inside the block, from any app."""
+    _install()
+    recorded = []
+    _recorders.append(recorded)
+    try:
+        yield recorded
+    finally:
+        _recorders.remove(recorded)
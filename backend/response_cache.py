@@ -0,0 +1,189 @@
+from flask import current_app
+from caching import LRUCache, RedisCache
+from etags import not_modified, tag_response
+from db_routing import use_primary
+import hashlib
+import threading
+import time
+
+# How long a request waits for another worker's rebuild of the same key
+# before building it itself
+SHARED_BUILD_WAIT = 2.0
+SHARED_BUILD_POLL = 0.05
+
+class ResponseCache:
+    """Two-tier cache of rendered JSON bodies with per-key stampede protection.
+
+    Entries are (etag, body) pairs. The in-process LRU is checked first, then
+    the optional shared tier. On a miss only one request per key rebuilds the
+    entry: requests in this process wait on a striped lock, and other workers
+    wait on a short-lived lock key in the shared tier and then read the result.
+
+    In-process entries can't see invalidations made by other workers, so keep
+    the local TTL short when running several workers.
+    """
+
+    def __init__(self, local, shared=None, lock_stripes=64):
+        self.local = local
+        self.shared = shared
+        self._locks = [threading.Lock() for _ in range(lock_stripes)]
+        self._generations = {}
+        self._generations_lock = threading.Lock()
+
+    def get(self, key):
+        entry = self.local.get(key)
+        if entry is not None or self.shared is None:
+            return entry
+
+        raw = self.shared.get(key)
+        if raw is None:
+            return None
+        etag, body = raw.split(b'\n', 1)
+        entry = (etag.decode(), body)
+        self.local.set(key, entry)
+        return entry
+
+    def set(self, key, entry):
+        self.local.set(key, entry)
+        if self.shared is not None:
+            etag, body = entry
+            self.shared.set(key, etag.encode() + b'\n' + body)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.local.delete(key)
+            if self.shared is not None:
+                self.shared.delete(key)
+
+    def generation(self, name):
+        """Counter for a family of keys that one write can make stale all at once.
+
+        Including it in the keys and bumping it retires every entry in the
+        family without knowing which keys exist. With a shared tier the
+        counter lives there, so a bump on one worker is seen by all of them.
+        """
+        if self.shared is None:
+            return self._generations.get(name, 0)
+        return int(self.shared.client.get(self.shared.prefix + 'generation:' + name) or 0)
+
+    def bump(self, name):
+        if self.shared is None:
+            with self._generations_lock:
+                self._generations[name] = self._generations.get(name, 0) + 1
+        else:
+            self.shared.client.incr(self.shared.prefix + 'generation:' + name)
+
+    def get_or_build(self, key, build):
+        """Return the entry for `key`, calling `build()` at most once per key at a time.
+
+        `build` returns an (etag, body) pair, or None if there is nothing to
+        cache (e.g. the row doesn't exist).
+        """
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+
+        with self._locks[hash(key) % len(self._locks)]:
+            # Another request may have built it while we waited
+            entry = self.get(key)
+            if entry is not None:
+                return entry
+
+            if self.shared is None or self._acquire_shared(key):
+                try:
+                    entry = build()
+                    if entry is not None:
+                        self.set(key, entry)
+                    return entry
+                finally:
+                    if self.shared is not None:
+                        self.shared.client.delete(self._lock_key(key))
+
+            # Another worker is rebuilding it; wait for its result
+            deadline = time.monotonic() + SHARED_BUILD_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(SHARED_BUILD_POLL)
+                entry = self.get(key)
+                if entry is not None:
+                    return entry
+
+            entry = build()
+            if entry is not None:
+                self.set(key, entry)
+            return entry
+
+    def _lock_key(self, key):
+        return self.shared.prefix + 'lock:' + key
+
+    def _acquire_shared(self, key):
+        return bool(self.shared.client.set(self._lock_key(key), b'1', nx=True, ex=int(SHARED_BUILD_WAIT) + 1))
+
+response_cache = ResponseCache(LRUCache(maxsize=1000, ttl=30))
+
+def init_response_cache(app):
+    """Configure the response cache from RESPONSE_CACHE_* settings."""
+    global response_cache
+    local = LRUCache(
+        maxsize=app.config.get('RESPONSE_CACHE_SIZE', 1000),
+        ttl=app.config.get('RESPONSE_CACHE_TTL', 30)
+    )
+    shared = None
+    if app.config.get('RESPONSE_CACHE_URL'):
+        shared = RedisCache(
+            app.config['RESPONSE_CACHE_URL'],
+            ttl=app.config.get('RESPONSE_CACHE_SHARED_TTL', 300),
+            prefix='response:'
+        )
+    response_cache = ResponseCache(local, shared)
+
+def company_key(company_id):
+    return f'company:{company_id}'
+
+def user_key(user_id):
+    return f'user:{user_id}'
+
+def matches_key(user_id):
+    return f'matches:{response_cache.generation("matches")}:{user_id}'
+
+def invalidate_match_lists():
+    """Retire every user's cached match list, e.g. after scores or listed profiles change."""
+    response_cache.bump('matches')
+
+def invalidate(*keys):
+    response_cache.delete(*keys)
+
+def json_entry(obj, etag=None):
+    """Render `obj` to a cache entry, using a content hash as the ETag if none is given."""
+    body = current_app.json.dumps(obj).encode()
+    if etag is None:
+        etag = hashlib.sha1(body).hexdigest()
+    return etag, body
+
+def cached_json(key, build, etag_probe=None):
+    """Serve a JSON body from the response cache, honouring If-None-Match.
+
+    On a miss `etag_probe`, if given, returns the current ETag from a cheap
+    lookup (or None if the row is gone) so a revalidation can be answered
+    without building the body. Returns None when there is nothing to serve.
+    """
+    entry = response_cache.get(key)
+
+    if entry is None and etag_probe is not None:
+        etag = etag_probe()
+        if etag is None:
+            return None
+        cached = not_modified(etag)
+        if cached:
+            return cached
+
+    if entry is None:
+        # Fill from the primary so a lagging replica can't pin stale data in the cache
+        with use_primary():
+            entry = response_cache.get_or_build(key, build)
+        if entry is None:
+            return None
+
+    etag, body = entry
+    return not_modified(etag) or tag_response(
+        current_app.response_class(body, mimetype='application/json'), etag
+    )
@@ -0,0 +1,32 @@
+from flask import Blueprint, current_app, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import User
+from bulk_import import import_stream
+
+admin_bp = Blueprint('admin', __name__)
+
+def _is_admin(user_id):
+    user = User.query.get(user_id)
+    return bool(user) and user.email.lower() in current_app.config.get('ADMIN_EMAILS', [])
+
+@admin_bp.route('/import', methods=['POST'])
+@jwt_required()
+def bulk_import():
+    """Stream an NDJSON or CSV body of companies, users and funding rounds into the database.
+
+    The body is read line by line and written in batches; the response lists the
+    rows that failed validation. Bodies are capped by MAX_CONTENT_LENGTH, so
+    larger files go through `flask import` instead.
+    """
+    if not _is_admin(get_jwt_identity()):
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    file_format = request.args.get('format') or ('csv' if request.mimetype == 'text/csv' else 'ndjson')
+    batch_size = request.args.get('batch_size', type=int)
+
+    try:
+        result = import_stream(request.stream, file_format, batch_size)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(result), 200
@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import User, db
+from serializers import serialize_account
+from identity import issue_token
 from datetime import datetime
 
 auth_bp = Blueprint('auth', __name__)
@@ -31,18 +33,13 @@ def signup():
         db.session.add(user)
         db.session.commit()
         
-        # Create access token
-        access_token = create_access_token(identity=user.id)
+        # Create access token; role and company ride along as claims
+        access_token = issue_token(user)
         
         return jsonify({
             'message': 'User created successfully',
             'access_token': access_token,
-            'user': {
-                'id': user.id,
-                'email': user.email,
-                'name': user.name,
-                'role': user.role
-            }
+            'user': serialize_account(user)
         }), 201
         
     except Exception as e:
@@ -63,17 +60,20 @@ def login():
     if not user or not user.check_password(data['password']):
         return jsonify({'error': 'Invalid email or password'}), 401
     
-    # Create access token
-    access_token = create_access_token(identity=user.id)
+    # Upgrade the stored hash if the configured algorithm or cost has changed
+    if user.password_needs_rehash():
+        user.set_password(data['password'])
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+    
+    # Create access token; role and company ride along as claims
+    access_token = issue_token(user)
     
     return jsonify({
         'access_token': access_token,
-        'user': {
-            'id': user.id,
-            'email': user.email,
-            'name': user.name,
-            'role': user.role
-        }
+        'user': serialize_account(user)
     }), 200
 
 @auth_bp.route('/me', methods=['GET'])
@@ -85,11 +85,4 @@ def get_current_user():
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
-    return jsonify({
-        'id': user.id,
-        'email': user.email,
-        'name': user.name,
-        'role': user.role,
-        'bio': user.bio,
-        'company_id': user.company_id
-    }), 200 
\ No newline at end of file
+    return jsonify(serialize_account(user, 'bio', 'company_id')), 200 
\ No newline at end of file
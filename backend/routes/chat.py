@@ -1,15 +1,32 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask_socketio import emit, join_room, leave_room
-from models import User, Message, Match, db
+from app import socketio
+from models import User, Message, db, conversation_key
+from message_batcher import message_batcher
+from match_auth import users_are_matched
+from metrics import timed_event
 from datetime import datetime
 
 chat_bp = Blueprint('chat', __name__)
-socketio = None
 
-def init_socketio(app):
-    global socketio
-    socketio = app.socketio
+# Page size for chat history when the client doesn't ask for one, and the most it may ask for
+DEFAULT_HISTORY_LIMIT = 50
+MAX_HISTORY_LIMIT = 200
+
+def encode_cursor(message):
+    return f"{message.created_at.isoformat()}_{message.id}"
+
+def decode_cursor(cursor):
+    """Parse a history cursor into (created_at, id); raises ValueError if malformed."""
+    created_at, message_id = cursor.rsplit('_', 1)
+    return datetime.fromisoformat(created_at), int(message_id)
+
+def parse_id(value):
+    """Read an id from a JSON body, accepting integers and integer strings; raises ValueError otherwise."""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f'{value!r} is not an id')
+    return int(value)
 
 @chat_bp.route('/history/<int:user_id>', methods=['GET'])
 @jwt_required()
@@ -17,19 +34,38 @@ def get_chat_history(user_id):
     current_user_id = get_jwt_identity()
     
     # Verify match exists
-    match = Match.query.filter(
-        ((Match.founder_id == current_user_id) & (Match.investor_id == user_id)) |
-        ((Match.founder_id == user_id) & (Match.investor_id == current_user_id))
-    ).first()
-    
-    if not match:
+    if not users_are_matched(current_user_id, user_id):
         return jsonify({'error': 'No match found between users'}), 404
     
-    # Get messages between users
-    messages = Message.query.filter(
-        ((Message.sender_id == current_user_id) & (Message.receiver_id == user_id)) |
-        ((Message.sender_id == user_id) & (Message.receiver_id == current_user_id))
-    ).order_by(Message.created_at).all()
+    try:
+        limit = min(int(request.args.get('limit', DEFAULT_HISTORY_LIMIT)), MAX_HISTORY_LIMIT)
+        before = decode_cursor(request.args['before']) if request.args.get('before') else None
+    except ValueError:
+        return jsonify({'error': 'Invalid pagination parameters'}), 400
+    
+    if limit < 1:
+        return jsonify({'error': 'Invalid pagination parameters'}), 400
+    
+    # Walk the conversation index newest first, starting just before the cursor
+    message_query = Message.query.filter(
+        Message.conversation_key == conversation_key(current_user_id, user_id)
+    )
+    
+    if before:
+        before_created_at, before_id = before
+        message_query = message_query.filter(
+            (Message.created_at < before_created_at) |
+            ((Message.created_at == before_created_at) & (Message.id < before_id))
+        )
+    
+    # Fetch one extra row to know whether there is an older page
+    messages = message_query.order_by(
+        Message.created_at.desc(), Message.id.desc()
+    ).limit(limit + 1).all()
+    
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    next_cursor = encode_cursor(messages[-1]) if has_more else None
     
     return jsonify({
         'messages': [{
@@ -39,7 +75,55 @@ def get_chat_history(user_id):
             'content': msg.content,
             'created_at': msg.created_at.isoformat(),
             'read': msg.read
-        } for msg in messages]
+        } for msg in reversed(messages)],
+        'next_cursor': next_cursor
+    }), 200
+
+@chat_bp.route('/conversations', methods=['GET'])
+@jwt_required()
+def get_conversations():
+    current_user_id = get_jwt_identity()
+    
+    # Latest message id and unread count per conversation the user takes part in
+    summary = db.session.query(
+        Message.conversation_key,
+        db.func.max(Message.id).label('last_message_id'),
+        db.func.sum(db.case(
+            ((Message.receiver_id == current_user_id) & (Message.read == False), 1),
+            else_=0
+        )).label('unread_count')
+    ).filter(
+        (Message.sender_id == current_user_id) | (Message.receiver_id == current_user_id)
+    ).group_by(Message.conversation_key).subquery()
+    
+    counterpart_id = db.case(
+        (Message.sender_id == current_user_id, Message.receiver_id),
+        else_=Message.sender_id
+    )
+    
+    rows = db.session.query(Message, User, summary.c.unread_count).join(
+        summary, Message.id == summary.c.last_message_id
+    ).join(
+        User, User.id == counterpart_id
+    ).order_by(Message.id.desc()).all()
+    
+    return jsonify({
+        'conversations': [{
+            'user': {
+                'id': user.id,
+                'name': user.name,
+                'role': user.role
+            },
+            'last_message': {
+                'id': msg.id,
+                'sender_id': msg.sender_id,
+                'receiver_id': msg.receiver_id,
+                'content': msg.content,
+                'created_at': msg.created_at.isoformat(),
+                'read': msg.read
+            },
+            'unread_count': int(unread_count or 0)
+        } for msg, user, unread_count in rows]
     }), 200
 
 @chat_bp.route('/send', methods=['POST'])
@@ -52,12 +136,7 @@ def send_message():
         return jsonify({'error': 'Missing required fields'}), 400
     
     # Verify match exists
-    match = Match.query.filter(
-        ((Match.founder_id == current_user_id) & (Match.investor_id == data['receiver_id'])) |
-        ((Match.founder_id == data['receiver_id']) & (Match.investor_id == current_user_id))
-    ).first()
-    
-    if not match:
+    if not users_are_matched(current_user_id, data['receiver_id']):
         return jsonify({'error': 'No match found between users'}), 404
     
     # Create new message
@@ -71,16 +150,16 @@ def send_message():
         db.session.add(message)
         db.session.commit()
         
-        # Emit message through WebSocket
-        if socketio:
-            room = f"chat_{min(current_user_id, data['receiver_id'])}_{max(current_user_id, data['receiver_id'])}"
-            socketio.emit('new_message', {
-                'id': message.id,
-                'sender_id': message.sender_id,
-                'receiver_id': message.receiver_id,
-                'content': message.content,
-                'created_at': message.created_at.isoformat()
-            }, room=room)
+        # Emit message through WebSocket; with a message queue configured this
+        # reaches the room on whichever worker the receiver is connected to
+        room = f"chat_{message.conversation_key}"
+        socketio.emit('new_message', {
+            'id': message.id,
+            'sender_id': message.sender_id,
+            'receiver_id': message.receiver_id,
+            'content': message.content,
+            'created_at': message.created_at.isoformat()
+        }, room=room)
         
         return jsonify({
             'message': 'Message sent successfully',
@@ -126,8 +205,60 @@ def mark_message_read(message_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@chat_bp.route('/read', methods=['PUT'])
+@jwt_required()
+def mark_messages_read():
+    current_user_id = get_jwt_identity()
+    data = request.get_json()
+    
+    # Either an explicit list of ids, or everything up to a message in one conversation
+    try:
+        if isinstance(data, dict) and isinstance(data.get('message_ids'), list):
+            condition = Message.id.in_([parse_id(message_id) for message_id in data['message_ids']])
+        elif isinstance(data, dict) and 'user_id' in data and 'up_to_message_id' in data:
+            condition = (
+                (Message.conversation_key == conversation_key(current_user_id, parse_id(data['user_id']))) &
+                (Message.id <= parse_id(data['up_to_message_id']))
+            )
+        else:
+            return jsonify({'error': 'Missing message_ids or user_id and up_to_message_id'}), 400
+    except ValueError:
+        return jsonify({'error': 'Message and user ids must be integers'}), 400
+    
+    try:
+        updated = db.session.execute(
+            db.update(Message).where(
+                condition,
+                Message.receiver_id == current_user_id,
+                Message.read == False
+            ).values(read=True).returning(Message.id, Message.sender_id),
+            execution_options={'synchronize_session': False}
+        ).all()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    
+    # One coalesced receipt per conversation rather than one event per message
+    read_by_sender = {}
+    for message_id, sender_id in updated:
+        read_by_sender.setdefault(sender_id, []).append(message_id)
+    
+    for sender_id, message_ids in read_by_sender.items():
+        socketio.emit('messages_read', {
+            'reader_id': current_user_id,
+            'message_ids': sorted(message_ids),
+            'up_to_message_id': max(message_ids)
+        }, room=f"chat_{conversation_key(current_user_id, sender_id)}")
+    
+    return jsonify({
+        'message': 'Messages marked as read',
+        'message_ids': sorted(message_id for message_id, _ in updated)
+    }), 200
+
 # WebSocket event handlers
 @socketio.on('join')
+@timed_event('join')
 @jwt_required()
 def on_join(data):
     current_user_id = get_jwt_identity()
@@ -140,6 +271,7 @@ def on_join(data):
     emit('status', {'msg': f'User {current_user_id} has joined the room.'}, room=room)
 
 @socketio.on('leave')
+@timed_event('leave')
 @jwt_required()
 def on_leave(data):
     current_user_id = get_jwt_identity()
@@ -148,4 +280,26 @@ def on_leave(data):
     room = f"chat_{min(current_user_id, other_user_id)}_{max(current_user_id, other_user_id)}"
     leave_room(room)
     
-    emit('status', {'msg': f'User {current_user_id} has left the room.'}, room=room) 
\ No newline at end of file
+    emit('status', {'msg': f'User {current_user_id} has left the room.'}, room=room) 
+
+@socketio.on('send_message')
+@timed_event('send_message')
+@jwt_required()
+def on_send_message(data):
+    """Send a message over the open socket; the return value is the client's ack."""
+    current_user_id = get_jwt_identity()
+    
+    if not data or 'receiver_id' not in data or 'content' not in data:
+        return {'error': 'Missing required fields'}
+    
+    # Verify match exists
+    if not users_are_matched(current_user_id, data['receiver_id']):
+        return {'error': 'No match found between users'}
+    
+    # Queued and committed together with other messages arriving in the same window
+    try:
+        message_data = message_batcher.submit(current_user_id, data['receiver_id'], data['content'])
+    except Exception as e:
+        return {'error': str(e)}
+    
+    return {'message_data': message_data}
@@ -1,20 +1,38 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import Company, User, FundingRound, db
+from flask_jwt_extended import jwt_required
+from models import Company, User, FundingRound, db, touch_company
+from etags import company_etag
+from response_cache import cached_json, json_entry, company_key, user_key, invalidate, invalidate_match_lists
+from company_index import invalidate_company_index
+from match_scores import invalidate_company_scores
+from identity import current_identity, issue_token, owns_company
+from serializers import (
+    COMPANY_DETAIL_LOADERS, serialize_company, serialize_company_detail, serialize_funding_round
+)
 from datetime import datetime
 
 company_bp = Blueprint('company', __name__)
 
+def _valuation_error(data):
+    """Why the request's valuation is unusable, or None if it is absent or a non-negative number."""
+    valuation = data.get('valuation')
+    if valuation is None:
+        return None
+    if isinstance(valuation, bool) or not isinstance(valuation, (int, float)):
+        return 'valuation must be a number'
+    if valuation < 0:
+        return 'valuation must not be negative'
+    return None
+
 @company_bp.route('/add', methods=['POST'])
 @jwt_required()
 def add_company():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
+    identity = current_identity()
     
-    if not user:
+    if not identity:
         return jsonify({'error': 'User not found'}), 404
     
-    if user.role != 'founder':
+    if identity.role != 'founder':
         return jsonify({'error': 'Only founders can add companies'}), 403
     
     data = request.get_json()
@@ -24,6 +42,10 @@ def add_company():
     if not all(field in data for field in required_fields):
         return jsonify({'error': 'Missing required fields'}), 400
     
+    valuation_error = _valuation_error(data)
+    if valuation_error:
+        return jsonify({'error': valuation_error}), 400
+    
     # Create new company
     company = Company(
         name=data['name'],
@@ -33,24 +55,33 @@ def add_company():
         valuation=data.get('valuation')
     )
     
+    user = User.query.get(identity.id)
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
     try:
+        # Flush for the new id, then link the user in the same transaction
         db.session.add(company)
-        db.session.commit()
+        db.session.flush()
         
-        # Associate user with company
+        # Associate user with company; their previous company's member list changes
+        previous_company_id = user.company_id
+        touch_company(previous_company_id)
         user.company_id = company.id
         db.session.commit()
         
+        invalidate(user_key(user.id), company_key(previous_company_id))
+        
+        # Refit the matchmaking index to include the new company, which is a
+        # candidate in everyone's match list
+        invalidate_company_index()
+        invalidate_match_lists()
+        
+        # The company_id claim changed, so hand back a token carrying the new one
         return jsonify({
             'message': 'Company created successfully',
-            'company': {
-                'id': company.id,
-                'name': company.name,
-                'description': company.description,
-                'industry': company.industry,
-                'funding_stage': company.funding_stage,
-                'valuation': company.valuation
-            }
+            'access_token': issue_token(user),
+            'company': serialize_company(company)
         }), 201
         
     except Exception as e:
@@ -60,37 +91,33 @@ def add_company():
 @company_bp.route('/<int:company_id>', methods=['GET'])
 @jwt_required()
 def get_company(company_id):
-    company = Company.query.get_or_404(company_id)
+    response = cached_json(
+        company_key(company_id),
+        lambda: _build_company(company_id),
+        etag_probe=lambda: _probe_company_etag(company_id)
+    )
+    if response is None:
+        return jsonify({'error': 'Company not found'}), 404
     
-    return jsonify({
-        'id': company.id,
-        'name': company.name,
-        'description': company.description,
-        'industry': company.industry,
-        'funding_stage': company.funding_stage,
-        'valuation': company.valuation,
-        'created_at': company.created_at.isoformat(),
-        'users': [{
-            'id': user.id,
-            'name': user.name,
-            'role': user.role
-        } for user in company.users],
-        'funding_rounds': [{
-            'id': round.id,
-            'round_type': round.round_type,
-            'amount': round.amount,
-            'date': round.date.isoformat() if round.date else None,
-            'investors': round.investors
-        } for round in company.funding_rounds]
-    }), 200
+    return response
+
+def _probe_company_etag(company_id):
+    """Current ETag from the row version alone, without loading users and funding rounds."""
+    row_version = db.session.query(Company.row_version).filter_by(id=company_id).scalar()
+    return company_etag(company_id, row_version) if row_version is not None else None
+
+def _build_company(company_id):
+    company = Company.query.options(*COMPANY_DETAIL_LOADERS).filter_by(id=company_id).first()
+    if not company:
+        return None
+    return json_entry(serialize_company_detail(company), company_etag(company.id, company.row_version))
 
 @company_bp.route('/<int:company_id>/funding', methods=['POST'])
 @jwt_required()
 def add_funding_round(company_id):
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
+    identity = current_identity()
     
-    if not user or user.company_id != company_id:
+    if not owns_company(identity, company_id):
         return jsonify({'error': 'Unauthorized'}), 403
     
     data = request.get_json()
@@ -111,17 +138,14 @@ def add_funding_round(company_id):
     
     try:
         db.session.add(funding_round)
+        touch_company(company_id)
         db.session.commit()
         
+        invalidate(company_key(company_id))
+        
         return jsonify({
             'message': 'Funding round added successfully',
-            'funding_round': {
-                'id': funding_round.id,
-                'round_type': funding_round.round_type,
-                'amount': funding_round.amount,
-                'date': funding_round.date.isoformat(),
-                'investors': funding_round.investors
-            }
+            'funding_round': serialize_funding_round(funding_round)
         }), 201
         
     except Exception as e:
@@ -131,33 +155,43 @@ def add_funding_round(company_id):
 @company_bp.route('/<int:company_id>', methods=['PUT'])
 @jwt_required()
 def update_company(company_id):
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
+    identity = current_identity()
     
-    if not user or user.company_id != company_id:
+    if not owns_company(identity, company_id):
         return jsonify({'error': 'Unauthorized'}), 403
     
     company = Company.query.get_or_404(company_id)
     data = request.get_json()
     
+    valuation_error = _valuation_error(data)
+    if valuation_error:
+        return jsonify({'error': valuation_error}), 400
+    
     try:
         # Update company fields
         for field in ['name', 'description', 'industry', 'funding_stage', 'valuation']:
             if field in data:
                 setattr(company, field, data[field])
         
+        # Drop cached match scores for this company if any scored field changed
+        if any(field in data for field in ['description', 'industry', 'funding_stage', 'valuation']):
+            invalidate_company_scores(company.id)
+        
         db.session.commit()
         
+        if 'description' in data or 'industry' in data:
+            invalidate_company_index()
+        
+        # Members' profiles embed the company
+        invalidate(company_key(company.id), *[user_key(member.id) for member in company.users])
+        
+        # Its scores against every other company changed, so any user's match list may have
+        if any(field in data for field in ['description', 'industry', 'funding_stage', 'valuation']):
+            invalidate_match_lists()
+        
         return jsonify({
             'message': 'Company updated successfully',
-            'company': {
-                'id': company.id,
-                'name': company.name,
-                'description': company.description,
-                'industry': company.industry,
-                'funding_stage': company.funding_stage,
-                'valuation': company.valuation
-            }
+            'company': serialize_company(company)
         }), 200
         
     except Exception as e:
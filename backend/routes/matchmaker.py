@@ -1,26 +1,19 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import User, Company, Match, db
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
+from vector_store import get_company_vectors, build_vector_store, store_directory
+from match_auth import invalidate_pair
+from identity import current_identity, current_company
+from response_cache import cached_json, json_entry, matches_key, invalidate, invalidate_match_lists
+from match_scores import ensure_scores, top_matches, pair_score, rebuild_scores
+import click
+import time
 
-matchmaker_bp = Blueprint('matchmaker', __name__)
+matchmaker_bp = Blueprint('matchmaker', __name__, cli_group='matchmaking')
 
 def calculate_company_similarity(company1, company2):
     """Calculate similarity between two companies based on their descriptions and industries."""
-    # Combine company features into text
-    text1 = f"{company1.description} {company1.industry}"
-    text2 = f"{company2.description} {company2.industry}"
-    
-    # Create TF-IDF vectors
-    vectorizer = TfidfVectorizer()
-    try:
-        tfidf_matrix = vectorizer.fit_transform([text1, text2])
-        similarity = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]
-        return similarity
-    except:
-        return 0.0
+    return float(get_company_vectors().similarities(company1, [company2])[0])
 
 def calculate_match_score(founder, investor):
     """Calculate match score between a founder and an investor."""
@@ -33,72 +26,58 @@ def calculate_match_score(founder, investor):
     if not founder_company or not investor_company:
         return 0.0
     
-    # Calculate base similarity score
-    similarity_score = calculate_company_similarity(founder_company, investor_company)
-    
-    # Adjust score based on funding stage
-    funding_stage_weights = {
-        'seed': 1.0,
-        'pre_seed': 0.9,
-        'series_a': 0.8,
-        'series_b': 0.7,
-        'series_c': 0.6,
-        'growth': 0.5
-    }
-    
-    stage_weight = funding_stage_weights.get(founder_company.funding_stage.lower(), 0.5)
-    
-    # Final match score
-    match_score = similarity_score * stage_weight
+    # Reuse the cached pair score when there is one
+    return pair_score(founder_company, investor_company)
+
+def build_matches(identity):
+    """Render the match list for a user as a response cache entry."""
+    current_user_id = identity.id
+    # The list is cached per user, so it must follow the user's company rather than the token's claim
+    company = current_company(identity)
+    
+    # Users without a company can't be scored
+    if not company:
+        return json_entry({'matches': []})
+    
+    # Ids of users the current user is already matched with
+    matched_ids = set()
+    for founder_id, investor_id in db.session.query(Match.founder_id, Match.investor_id).filter(
+        (Match.founder_id == current_user_id) | (Match.investor_id == current_user_id)
+    ):
+        matched_ids.add(investor_id if founder_id == current_user_id else founder_id)
+    
+    # Fill in any missing cached scores, then read the top 10 straight from the cache
+    vectors_version = ensure_scores(company, identity.role)
+    results = top_matches(
+        company,
+        identity.role,
+        exclude_user_ids=matched_ids,
+        threshold=0.3,  # Only include matches with score > 0.3
+        limit=10,
+        vectors_version=vectors_version
+    )
     
-    return match_score
+    return json_entry({
+        'matches': [{
+            'user': {
+                'id': user.id,
+                'name': user.name,
+                'role': user.role,
+                'bio': user.bio
+            },
+            'match_score': match_score
+        } for user, match_score in results]
+    })
 
 @matchmaker_bp.route('/matches', methods=['GET'])
 @jwt_required()
 def get_matches():
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
+    identity = current_identity()
     
-    if not current_user:
+    if not identity:
         return jsonify({'error': 'User not found'}), 404
     
-    # Get all potential matches based on role
-    if current_user.role == 'founder':
-        potential_matches = User.query.filter_by(role='investor').all()
-    else:
-        potential_matches = User.query.filter_by(role='founder').all()
-    
-    matches = []
-    for potential_match in potential_matches:
-        # Skip if match already exists
-        existing_match = Match.query.filter(
-            ((Match.founder_id == current_user_id) & (Match.investor_id == potential_match.id)) |
-            ((Match.founder_id == potential_match.id) & (Match.investor_id == current_user_id))
-        ).first()
-        
-        if existing_match:
-            continue
-        
-        # Calculate match score
-        match_score = calculate_match_score(current_user, potential_match)
-        
-        if match_score > 0.3:  # Only include matches with score > 0.3
-            matches.append({
-                'user': {
-                    'id': potential_match.id,
-                    'name': potential_match.name,
-                    'role': potential_match.role,
-                    'bio': potential_match.bio
-                },
-                'match_score': match_score
-            })
-    
-    # Sort matches by score
-    matches.sort(key=lambda x: x['match_score'], reverse=True)
-    
-    return jsonify({
-        'matches': matches[:10]  # Return top 10 matches
-    }), 200
+    return cached_json(matches_key(identity.id), lambda: build_matches(identity))
 
 @matchmaker_bp.route('/connect', methods=['POST'])
 @jwt_required()
@@ -147,6 +126,12 @@ def create_match():
         db.session.add(match)
         db.session.commit()
         
+        # The pair may have a cached "not matched" entry for chat authorization
+        invalidate_pair(match.founder_id, match.investor_id)
+        
+        # Each side drops out of the other's match list
+        invalidate(matches_key(match.founder_id), matches_key(match.investor_id))
+        
         return jsonify({
             'message': 'Match created successfully',
             'match': {
@@ -181,6 +166,8 @@ def update_match_status(match_id):
         match.status = data['status']
         db.session.commit()
         
+        invalidate_pair(match.founder_id, match.investor_id)
+        
         return jsonify({
             'message': 'Match status updated successfully',
             'match': {
@@ -194,4 +181,40 @@ def update_match_status(match_id):
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': str(e)}), 500 
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500 
+
+@matchmaker_bp.cli.command('rebuild')
+@click.option('--workers', type=int, default=None, help='Worker processes (defaults to the CPU count).')
+@click.option('--chunk-size', type=int, default=256, show_default=True, help='Founder companies per block.')
+@click.option('--resume', is_flag=True, help='Skip founder companies that are already fully scored.')
+def rebuild_matches(workers, chunk_size, resume):
+    """Recompute every founder x investor match score."""
+    started = time.perf_counter()
+    pairs = 0
+    
+    for done, total, written in rebuild_scores(workers=workers, chunk_size=chunk_size, resume=resume):
+        pairs += written
+        elapsed = time.perf_counter() - started
+        click.echo(f'{done}/{total} founder companies, {pairs} pairs, {pairs / elapsed:.0f} pairs/s')
+    
+    invalidate_match_lists()
+    elapsed = time.perf_counter() - started
+    click.echo(f'Rebuilt {pairs} match scores in {elapsed:.1f}s')
+
+@matchmaker_bp.cli.command('build-vectors')
+@click.option('--components', type=int, default=256, show_default=True, help='LSA dimensions to keep.')
+@click.option('--keep', type=int, default=2, show_default=True, help='Number of builds to keep on disk.')
+def build_vectors(components, keep):
+    """Build and publish the memory-mapped company vector store."""
+    started = time.perf_counter()
+    store = build_vector_store(store_directory(), n_components=components, keep=keep)
+    
+    if store is None:
+        click.echo('No company text to index')
+        return
+    
+    invalidate_match_lists()
+    click.echo(
+        f'Published build {store.version}: {len(store.company_ids)} companies x '
+        f'{store.matrix.shape[1]} dimensions in {time.perf_counter() - started:.1f}s'
+    )
@@ -1,30 +1,52 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import User, Company, db
-from werkzeug.security import generate_password_hash
+from models import User, Company, Match, db, touch_company
+from etags import user_etag, not_modified, tag_response
+from response_cache import cached_json, json_entry, company_key, user_key, invalidate, invalidate_match_lists
+from user_search import apply_search
+from identity import current_identity
+from serializers import (
+    PUBLIC_USER_LOADERS, FOUNDER_CONNECTION_LOADERS, INVESTOR_CONNECTION_LOADERS,
+    serialize_account, serialize_company_brief, serialize_public_user
+)
 
 user_bp = Blueprint('user', __name__)
 
+def _user_etag(user):
+    return user_etag(user.id, user.row_version, user.company.row_version if user.company else None)
+
+def _probe_user_etag(user_id):
+    """Current ETag from the user's and company's row versions, or None if the user doesn't exist."""
+    versions = db.session.query(User.row_version, Company.row_version).outerjoin(
+        Company, User.company_id == Company.id
+    ).filter(User.id == user_id).first()
+    return user_etag(user_id, *versions) if versions is not None else None
+
+def _not_modified_user(user_id):
+    """304 response if the client's copy of the user (and their company) is current, else None."""
+    etag = _probe_user_etag(user_id)
+    return not_modified(etag) if etag else None
+
+def _build_user(user_id):
+    user = User.query.options(*PUBLIC_USER_LOADERS).filter_by(id=user_id).first()
+    if not user:
+        return None
+    return json_entry(serialize_public_user(user, include_valuation=True), _user_etag(user))
+
 @user_bp.route('/profile', methods=['GET'])
 @jwt_required()
 def get_profile():
     current_user_id = get_jwt_identity()
-    user = User.query.get_or_404(current_user_id)
     
-    return jsonify({
-        'id': user.id,
-        'email': user.email,
-        'name': user.name,
-        'role': user.role,
-        'bio': user.bio,
-        'company': {
-            'id': user.company.id,
-            'name': user.company.name,
-            'industry': user.company.industry,
-            'funding_stage': user.company.funding_stage,
-            'valuation': user.company.valuation
-        } if user.company else None
-    }), 200
+    cached = _not_modified_user(current_user_id)
+    if cached:
+        return cached
+    
+    user = User.query.options(*PUBLIC_USER_LOADERS).filter_by(id=current_user_id).first_or_404()
+    
+    data = serialize_account(user, 'bio')
+    data['company'] = serialize_company_brief(user.company, include_valuation=True)
+    return tag_response(jsonify(data), _user_etag(user)), 200
 
 @user_bp.route('/profile', methods=['PUT'])
 @jwt_required()
@@ -37,22 +59,24 @@ def update_profile():
         # Update user fields
         if 'name' in data:
             user.name = data['name']
+            # Member names are shown on the company page
+            touch_company(user.company_id)
         if 'bio' in data:
             user.bio = data['bio']
         if 'password' in data:
-            user.password_hash = generate_password_hash(data['password'])
+            user.set_password(data['password'])
         
         db.session.commit()
         
+        invalidate(user_key(user.id), company_key(user.company_id))
+        
+        # Name and bio are shown in other users' match lists
+        if 'name' in data or 'bio' in data:
+            invalidate_match_lists()
+        
         return jsonify({
             'message': 'Profile updated successfully',
-            'user': {
-                'id': user.id,
-                'email': user.email,
-                'name': user.name,
-                'role': user.role,
-                'bio': user.bio
-            }
+            'user': serialize_account(user, 'bio')
         }), 200
         
     except Exception as e:
@@ -63,7 +87,6 @@ def update_profile():
 @jwt_required()
 def search_users():
     current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
     
     # Get query parameters
     query = request.args.get('q', '')
@@ -71,13 +94,7 @@ def search_users():
     industry = request.args.get('industry')
     
     # Build query
-    user_query = User.query.filter(User.id != current_user_id)
-    
-    if query:
-        user_query = user_query.filter(
-            (User.name.ilike(f'%{query}%')) |
-            (User.bio.ilike(f'%{query}%'))
-        )
+    user_query = User.query.options(*PUBLIC_USER_LOADERS).filter(User.id != current_user_id)
     
     if role:
         user_query = user_query.filter(User.role == role)
@@ -85,68 +102,43 @@ def search_users():
     if industry:
         user_query = user_query.join(Company).filter(Company.industry == industry)
     
+    # Full-text match on name and bio, ranked by relevance
+    if query:
+        user_query = apply_search(user_query, query)
+    
     # Get results
     users = user_query.limit(20).all()
     
     return jsonify({
-        'users': [{
-            'id': user.id,
-            'name': user.name,
-            'role': user.role,
-            'bio': user.bio,
-            'company': {
-                'id': user.company.id,
-                'name': user.company.name,
-                'industry': user.company.industry,
-                'funding_stage': user.company.funding_stage
-            } if user.company else None
-        } for user in users]
+        'users': [serialize_public_user(user) for user in users]
     }), 200
 
 @user_bp.route('/connections', methods=['GET'])
 @jwt_required()
 def get_connections():
     current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
     
-    # Get all matches for the current user
-    if current_user.role == 'founder':
-        matches = Match.query.filter_by(founder_id=current_user_id).all()
+    # Get all matches for the current user, with the other side and their company loaded up front
+    if current_identity().role == 'founder':
+        matches = Match.query.options(*FOUNDER_CONNECTION_LOADERS).filter_by(founder_id=current_user_id).all()
         connected_users = [match.investor for match in matches]
     else:
-        matches = Match.query.filter_by(investor_id=current_user_id).all()
+        matches = Match.query.options(*INVESTOR_CONNECTION_LOADERS).filter_by(investor_id=current_user_id).all()
         connected_users = [match.founder for match in matches]
     
     return jsonify({
-        'connections': [{
-            'id': user.id,
-            'name': user.name,
-            'role': user.role,
-            'bio': user.bio,
-            'company': {
-                'id': user.company.id,
-                'name': user.company.name,
-                'industry': user.company.industry,
-                'funding_stage': user.company.funding_stage
-            } if user.company else None
-        } for user in connected_users]
+        'connections': [serialize_public_user(user) for user in connected_users]
     }), 200
 
 @user_bp.route('/<int:user_id>', methods=['GET'])
 @jwt_required()
 def get_user(user_id):
-    user = User.query.get_or_404(user_id)
+    response = cached_json(
+        user_key(user_id),
+        lambda: _build_user(user_id),
+        etag_probe=lambda: _probe_user_etag(user_id)
+    )
+    if response is None:
+        return jsonify({'error': 'User not found'}), 404
     
-    return jsonify({
-        'id': user.id,
-        'name': user.name,
-        'role': user.role,
-        'bio': user.bio,
-        'company': {
-            'id': user.company.id,
-            'name': user.company.name,
-            'industry': user.company.industry,
-            'funding_stage': user.company.funding_stage,
-            'valuation': user.company.valuation
-        } if user.company else None
-    }), 200 
\ No newline at end of file
+    return response
@@ -0,0 +1,102 @@
+from flask.json.provider import DefaultJSONProvider
+from models import User, Company, Match
+from sqlalchemy.orm import joinedload, selectinload
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+# Loader options each serializer expects, so a listing resolves in a fixed
+# number of queries instead of one lazy load per row
+PUBLIC_USER_LOADERS = (joinedload(User.company),)
+COMPANY_DETAIL_LOADERS = (selectinload(Company.users), selectinload(Company.funding_rounds))
+FOUNDER_CONNECTION_LOADERS = (joinedload(Match.investor).joinedload(User.company),)
+INVESTOR_CONNECTION_LOADERS = (joinedload(Match.founder).joinedload(User.company),)
+
+def serialize_company_brief(company, include_valuation=False):
+    if company is None:
+        return None
+    data = {
+        'id': company.id,
+        'name': company.name,
+        'industry': company.industry,
+        'funding_stage': company.funding_stage
+    }
+    if include_valuation:
+        data['valuation'] = company.valuation
+    return data
+
+def serialize_public_user(user, include_valuation=False):
+    """User as other users see it, with a brief company. Load with PUBLIC_USER_LOADERS."""
+    return {
+        'id': user.id,
+        'name': user.name,
+        'role': user.role,
+        'bio': user.bio,
+        'company': serialize_company_brief(user.company, include_valuation)
+    }
+
+def serialize_account(user, *fields):
+    """The user's own account: id, email, name and role plus any extra `fields`."""
+    data = {
+        'id': user.id,
+        'email': user.email,
+        'name': user.name,
+        'role': user.role
+    }
+    for field in fields:
+        data[field] = getattr(user, field)
+    return data
+
+def serialize_company(company):
+    return {
+        'id': company.id,
+        'name': company.name,
+        'description': company.description,
+        'industry': company.industry,
+        'funding_stage': company.funding_stage,
+        'valuation': company.valuation
+    }
+
+def serialize_funding_round(funding_round):
+    return {
+        'id': funding_round.id,
+        'round_type': funding_round.round_type,
+        'amount': funding_round.amount,
+        'date': funding_round.date.isoformat() if funding_round.date else None,
+        'investors': funding_round.investors
+    }
+
+def serialize_company_detail(company):
+    """Company with its users and funding rounds. Load with COMPANY_DETAIL_LOADERS."""
+    data = serialize_company(company)
+    data['created_at'] = company.created_at.isoformat()
+    data['users'] = [{
+        'id': user.id,
+        'name': user.name,
+        'role': user.role
+    } for user in company.users]
+    data['funding_rounds'] = [serialize_funding_round(r) for r in company.funding_rounds]
+    return data
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Encode responses with orjson when it is installed.
+
+    orjson writes datetimes as ISO 8601 rather than HTTP dates; the routes
+    already send isoformat() strings, so responses are unchanged.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS),
+            mimetype=self.mimetype
+        )
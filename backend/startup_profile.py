@@ -0,0 +1,68 @@
+import click
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+# Run in a fresh interpreter so nothing is already imported
+PROFILE_SCRIPT = '''
+import json
+import time
+
+started = time.perf_counter()
+import app as module
+imported = time.perf_counter()
+application = module.create_app()
+created = time.perf_counter()
+
+from company_index import preload_ml_stack
+preload_ml_stack()
+ml_loaded = time.perf_counter()
+
+print(json.dumps({
+    'import': imported - started,
+    'create_app': created - imported,
+    'phases': application.extensions.get('startup_timings', []),
+    'ml_stack': ml_loaded - created
+}))
+'''
+
+# import time:  <self us> | <cumulative us> | <two spaces per nesting level><module>
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+
+def import_time_by_package(stderr):
+    """Seconds spent importing each root package's own modules, excluding its dependencies."""
+    packages = defaultdict(float)
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            packages[match.group(4).split('.')[0]] += int(match.group(1)) / 1e6
+    return packages
+
+@click.command('startup-profile')
+@click.option('--top', type=int, default=15, show_default=True, help='Number of packages to list.')
+def startup_profile(top):
+    """Report where a cold start of the app spends its time."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROFILE_SCRIPT],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise click.ClickException(result.stderr.strip().splitlines()[-1])
+
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+
+    click.echo(f'import app         {timings["import"]:8.3f}s')
+    click.echo(f'create_app()       {timings["create_app"]:8.3f}s')
+    for name, seconds in timings['phases']:
+        click.echo(f'  {name:<16} {seconds:8.3f}s')
+    click.echo(f'ML stack (lazy)    {timings["ml_stack"]:8.3f}s  paid on first matchmaking use unless PRELOAD_ML_STACK is set')
+
+    click.echo('\nImport time by package, including the lazy ML stack:')
+    packages = sorted(import_time_by_package(result.stderr).items(), key=lambda item: item[1], reverse=True)
+    for package, seconds in packages[:top]:
+        click.echo(f'  {package:<30} {seconds:8.3f}s')
@@ -0,0 +1,94 @@
+import os
+
+# Settings are read when config.py is imported, so pin them before the app
+# loads .env: no message queue or shared caches unless a test asks for them
+os.environ['SOCKETIO_MESSAGE_QUEUE'] = ''
+os.environ['RESPONSE_CACHE_URL'] = ''
+os.environ['CHAT_AUTH_CACHE_URL'] = ''
+os.environ['DATABASE_REPLICA_URL'] = ''
+os.environ['PASSWORD_HASH_COST'] = '1000'
+
+import socket
+import threading
+
+import pytest
+from flask import g
+from app import create_app, db
+from config import TestingConfig
+from models import User, Company
+from identity import issue_token
+from company_index import invalidate_company_index
+
+pytest_plugins = ['pytest_query_budget']
+
+@pytest.fixture
+def app_settings():
+    """Settings to apply over TestingConfig before the app is created; override per module."""
+    return {}
+
+@pytest.fixture
+def app(tmp_path, monkeypatch, app_settings):
+    for name, value in app_settings.items():
+        monkeypatch.setattr(TestingConfig, name, value)
+    app = create_app('testing')
+    app.config['COMPANY_VECTOR_STORE'] = str(tmp_path / 'company_vectors')
+
+    # Requests reuse the app context pushed below rather than getting their
+    # own, so clear g after each one as a fresh context would
+    @app.teardown_request
+    def clear_request_globals(exc):
+        g.__dict__.clear()
+
+    invalidate_company_index()
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.drop_all(bind_key=None)
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def make_user(app):
+    """Create a user with a company of their own; returns the user."""
+    def make_user(role, description, industry='saas', funding_stage='seed', valuation=None, name=None):
+        company = Company(
+            name=f'{name or role} company', description=description, industry=industry,
+            funding_stage=funding_stage, valuation=valuation
+        )
+        db.session.add(company)
+        db.session.flush()
+        user = User(
+            email=f'{role}{company.id}@example.com', name=name or f'{role.title()} {company.id}',
+            role=role, company_id=company.id
+        )
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make_user
+
+@pytest.fixture
+def auth_headers(app):
+    """Authorization header for a user, as issued at login."""
+    def auth_headers(user):
+        return {'Authorization': f'Bearer {issue_token(user)}'}
+    return auth_headers
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+@pytest.fixture
+def redis_url():
+    """URL of a Redis stand-in (fakeredis's TCP server) running for one test."""
+    fakeredis = pytest.importorskip('fakeredis')
+    pytest.importorskip('redis')
+    server = fakeredis.TcpFakeServer(('127.0.0.1', free_port()), server_type='redis')
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'redis://{}:{}/0'.format(*server.server_address)
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,82 @@
+from app import db
+from models import Company, User
+from bulk_import import import_stream
+from company_index import get_company_index
+from vector_store import build_vector_store, load_vector_store, store_directory
+import bulk_import
+import io
+import json
+
+def ndjson(*records):
+    return io.BytesIO(''.join(json.dumps(record) + '\n' for record in records).encode())
+
+def company(ref, description='payments for small businesses'):
+    return {'type': 'company', 'ref': ref, 'name': ref.title(), 'description': description,
+            'industry': 'fintech', 'funding_stage': 'seed'}
+
+def user(email, ref):
+    return {'type': 'user', 'email': email, 'password': 'password', 'name': email, 'role': 'founder',
+            'company': ref}
+
+def test_a_database_error_fails_only_its_own_row(app, monkeypatch):
+    hash_passwords = bulk_import.hash_passwords
+
+    def racing_hash_passwords(passwords):
+        # Someone signs up with one of the emails after the import checked it
+        if not User.query.filter_by(email='b@example.com').count():
+            with db.engine.begin() as connection:
+                connection.execute(db.insert(User).values(
+                    email='b@example.com', password_hash='x', name='B', role='founder'
+                ))
+        return hash_passwords(passwords)
+    monkeypatch.setattr(bulk_import, 'hash_passwords', racing_hash_passwords)
+
+    result = import_stream(ndjson(
+        company('acme'), user('a@example.com', 'acme'), user('b@example.com', 'acme'), user('c@example.com', 'acme')
+    ), 'ndjson')
+
+    assert result['imported'] == {'company': 1, 'user': 2, 'funding_round': 0}
+    assert [error['line'] for error in result['errors']] == [3]
+    assert result['errors'][0]['error'] == 'Email b@example.com is already registered'
+
+def test_rows_naming_a_failed_company_are_reported(app, monkeypatch):
+    company_row = bulk_import._company_row
+
+    def nameless_company_row(record):
+        # A row the validation lets through but the database rejects
+        row = company_row(record)
+        return dict(row, name=None) if record['ref'] == 'broken' else row
+    monkeypatch.setattr(bulk_import, '_company_row', nameless_company_row)
+
+    result = import_stream(ndjson(
+        company('acme'), company('broken'), user('a@example.com', 'broken'), user('b@example.com', 'acme')
+    ), 'ndjson')
+
+    assert result['imported'] == {'company': 1, 'user': 1, 'funding_round': 0}
+    assert [error['line'] for error in result['errors']] == [2, 3]
+    assert 'NOT NULL' in result['errors'][0]['error']
+    assert result['errors'][1]['error'] == "Company 'broken' was not imported"
+
+def test_workers_refit_their_index_once_companies_are_added(app, make_user):
+    make_user('founder', 'payments for small businesses')
+    index = get_company_index()
+
+    # Written by another worker or an import, which can't reach this process's index
+    newcomer = make_user('investor', 'clinical trials for hospitals')
+
+    refit = get_company_index()
+    assert refit is not index
+    assert newcomer.company_id in refit.rows
+    assert 'clinical' in refit.vectorizer.vocabulary_
+
+def test_importing_companies_publishes_a_new_vector_build(app, make_user):
+    for description in ['payments for small businesses', 'clinical trials', 'carbon accounting', 'fleet routing']:
+        make_user('founder', description)
+    published = build_vector_store(store_directory(), n_components=2)
+
+    import_stream(ndjson(company('acme', 'hospital staffing')), 'ndjson')
+
+    store = load_vector_store()
+    assert store.version != published.version
+    assert store.matrix.shape[1] == 2
+    assert Company.query.filter_by(name='Acme').one().id in store.rows
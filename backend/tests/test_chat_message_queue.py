@@ -0,0 +1,59 @@
+"""Chat delivery between two app processes sharing a Socket.IO message queue.
+
+The queue is the `redis_url` Redis stand-in, and the two servers run under
+gunicorn with one eventlet worker each, as in production.
+"""
+import signal
+import time
+
+import pytest
+
+pytest.importorskip('requests')
+pytest.importorskip('websocket')
+
+from app import db
+from models import Match
+from benchmarks.chat_load import Client, Stats, start_servers
+from tests.conftest import free_port
+
+@pytest.fixture
+def app_settings(tmp_path):
+    # A database file the server processes can open too
+    return {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "chat.db"}'}
+
+@pytest.fixture
+def servers(app, redis_url, tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', app.config['SQLALCHEMY_DATABASE_URI'])
+    monkeypatch.setenv('SOCKETIO_MESSAGE_QUEUE', redis_url)
+    monkeypatch.setenv('QUERY_INSPECTOR', 'False')
+    servers = start_servers(2, free_port(), str(tmp_path))
+    yield [url for url, _ in servers]
+    for _, process in servers:
+        # Quick shutdown: a graceful one waits out the workers' open queue connections
+        process.send_signal(signal.SIGINT)
+        process.wait()
+
+def test_messages_reach_a_receiver_connected_to_another_process(app, make_user, servers):
+    founder = make_user('founder', 'payments for small businesses')
+    investor = make_user('investor', 'payments for small businesses')
+    db.session.add(Match(founder_id=founder.id, investor_id=investor.id, status='pending'))
+    db.session.commit()
+
+    stats = Stats()
+    sender = Client(servers[0], founder.email, 'password', investor.id, stats)
+    receiver = Client(servers[1], investor.email, 'password', founder.id, stats)
+    try:
+        sender.connect()
+        receiver.connect()
+        for k in range(5):
+            sender.send(f'hello {k}')
+
+        deadline = time.monotonic() + 10
+        while len(stats.delivered) < 5 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        sender.close()
+        receiver.close()
+
+    assert stats.errors == 0
+    assert stats.delivered == {f'hello {k}' for k in range(5)}
@@ -0,0 +1,94 @@
+import pytest
+from app import db
+from models import Match, Message
+
+@pytest.fixture
+def pair(make_user):
+    """A matched founder and investor; returns (founder, investor)."""
+    founder = make_user('founder', 'payments for small businesses')
+    investor = make_user('investor', 'fintech seed rounds')
+    db.session.add(Match(founder_id=founder.id, investor_id=investor.id, status='accepted'))
+    db.session.commit()
+    return founder, investor
+
+def send(sender, receiver, count):
+    """Store count messages from sender to receiver; returns their ids, oldest first."""
+    messages = [Message(sender_id=sender.id, receiver_id=receiver.id, content=f'message {i}') for i in range(count)]
+    db.session.add_all(messages)
+    db.session.commit()
+    return [message.id for message in messages]
+
+def test_history_pages_back_from_the_newest_message(client, pair, auth_headers):
+    founder, investor = pair
+    sent = send(founder, investor, 3) + send(investor, founder, 2)
+    headers = auth_headers(founder)
+
+    first = client.get(f'/api/chat/history/{investor.id}?limit=2', headers=headers).get_json()
+    assert [message['id'] for message in first['messages']] == sent[3:]
+    second = client.get(f'/api/chat/history/{investor.id}?limit=2&before={first["next_cursor"]}', headers=headers).get_json()
+    assert [message['id'] for message in second['messages']] == sent[1:3]
+    last = client.get(f'/api/chat/history/{investor.id}?limit=2&before={second["next_cursor"]}', headers=headers).get_json()
+    assert ([message['id'] for message in last['messages']], last['next_cursor']) == (sent[:1], None)
+
+def test_history_only_includes_the_requested_conversation(client, pair, make_user, auth_headers):
+    founder, investor = pair
+    other = make_user('investor', 'clinical trials')
+    db.session.add(Match(founder_id=founder.id, investor_id=other.id, status='accepted'))
+    sent = send(founder, investor, 2)
+    send(founder, other, 2)
+
+    response = client.get(f'/api/chat/history/{founder.id}', headers=auth_headers(investor))
+    assert [message['id'] for message in response.get_json()['messages']] == sent
+
+@pytest.mark.parametrize('query', ['limit=0', 'limit=many', 'before=yesterday'])
+def test_invalid_history_pagination_is_rejected(client, pair, auth_headers, query):
+    founder, investor = pair
+
+    response = client.get(f'/api/chat/history/{investor.id}?{query}', headers=auth_headers(founder))
+    assert response.status_code == 400
+
+def test_listed_messages_are_marked_read_for_the_receiver_only(client, pair, auth_headers):
+    founder, investor = pair
+    received = send(founder, investor, 3)
+    sent = send(investor, founder, 1)
+
+    response = client.put('/api/chat/read', json={'message_ids': received[:2] + sent}, headers=auth_headers(investor))
+    assert response.get_json()['message_ids'] == received[:2]
+    assert [message.read for message in Message.query.order_by(Message.id)] == [True, True, False, False]
+
+def test_messages_up_to_a_watermark_are_marked_read(client, pair, auth_headers):
+    founder, investor = pair
+    received = send(founder, investor, 3)
+
+    response = client.put('/api/chat/read', json={'user_id': founder.id, 'up_to_message_id': received[1]}, headers=auth_headers(investor))
+    assert response.get_json()['message_ids'] == received[:2]
+
+@pytest.mark.parametrize('body', [
+    {'message_ids': [1, 'two']},
+    {'message_ids': [None]},
+    {'message_ids': [True]},
+    {'user_id': 'founder', 'up_to_message_id': 1},
+    {'user_id': 1, 'up_to_message_id': '1.5'},
+    {'user_id': 1, 'up_to_message_id': [1]},
+])
+def test_non_integer_ids_are_rejected(client, pair, auth_headers, body):
+    founder, investor = pair
+    send(founder, investor, 1)
+
+    response = client.put('/api/chat/read', json=body, headers=auth_headers(investor))
+    assert (response.status_code, response.get_json()) == (400, {'error': 'Message and user ids must be integers'})
+    assert not Message.query.one().read
+
+def test_conversations_list_the_last_message_and_unread_count(client, pair, make_user, auth_headers):
+    founder, investor = pair
+    other = make_user('founder', 'clinical trials')
+    db.session.add(Match(founder_id=other.id, investor_id=investor.id, status='accepted'))
+    received = send(founder, investor, 3)
+    client.put('/api/chat/read', json={'message_ids': received[:1]}, headers=auth_headers(investor))
+    latest = send(investor, other, 1)
+
+    conversations = client.get('/api/chat/conversations', headers=auth_headers(investor)).get_json()['conversations']
+    assert [(c['user']['id'], c['last_message']['id'], c['unread_count']) for c in conversations] == [
+        (other.id, latest[0], 0),
+        (founder.id, received[-1], 2),
+    ]
@@ -0,0 +1,19 @@
+from app import db
+from company_index import get_company_index
+import pytest
+
+def test_companies_edited_by_another_worker_are_scored_from_their_new_text(app, make_user):
+    founder = make_user('founder', 'payments for small businesses').company
+    payments = make_user('investor', 'payments for small businesses').company
+    trials = make_user('investor', 'clinical trials for hospitals').company
+    index = get_company_index()
+    assert index.similarities(founder, [payments, trials]).argmax() == 0
+
+    # Committed without touching this process's index, as another worker would
+    founder.description = 'clinical trials for hospitals'
+    db.session.commit()
+
+    assert get_company_index() is index
+    similarities = index.similarities(founder, [payments, trials])
+    assert similarities.argmax() == 1
+    assert similarities[1] == pytest.approx(1.0)
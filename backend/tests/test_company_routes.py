@@ -0,0 +1,69 @@
+import pytest
+from query_inspector import record_requests
+from response_cache import company_key, invalidate
+
+NEW_COMPANY = {'name': 'Second Co', 'description': 'clinical trials', 'industry': 'health', 'funding_stage': 'seed'}
+FUNDING_ROUND = {'round_type': 'seed', 'amount': 500000, 'date': '2026-01-15'}
+
+@pytest.fixture
+def moved_founder(client, make_user, auth_headers):
+    """A founder who created a second company; returns (token from before, old id, new id)."""
+    founder = make_user('founder', 'payments for small businesses')
+    old_company_id = founder.company_id
+    headers = auth_headers(founder)
+    response = client.post('/api/companies/add', json=NEW_COMPANY, headers=headers)
+    assert response.status_code == 201
+    return headers, old_company_id, response.get_json()['company']['id']
+
+def test_an_older_token_can_edit_the_users_new_company(client, moved_founder):
+    headers, _, new_company_id = moved_founder
+
+    response = client.put(f'/api/companies/{new_company_id}', json={'name': 'Renamed'}, headers=headers)
+    assert response.status_code == 200
+    response = client.post(f'/api/companies/{new_company_id}/funding', json=FUNDING_ROUND, headers=headers)
+    assert response.status_code == 201
+
+def test_an_older_token_cannot_edit_a_company_the_user_left(client, moved_founder):
+    headers, old_company_id, _ = moved_founder
+
+    response = client.put(f'/api/companies/{old_company_id}', json={'name': 'Hijacked'}, headers=headers)
+    assert response.status_code == 403
+    response = client.post(f'/api/companies/{old_company_id}/funding', json=FUNDING_ROUND, headers=headers)
+    assert response.status_code == 403
+
+def test_other_users_cannot_edit_a_company(client, make_user, auth_headers):
+    owner = make_user('founder', 'payments for small businesses')
+    other = make_user('founder', 'clinical trials')
+
+    response = client.put(f'/api/companies/{owner.company_id}', json={'name': 'Hijacked'}, headers=auth_headers(other))
+    assert response.status_code == 403
+
+@pytest.mark.parametrize('valuation, error', [(-1, 'valuation must not be negative'), ('lots', 'valuation must be a number')])
+def test_invalid_valuations_are_rejected(client, make_user, auth_headers, valuation, error):
+    founder = make_user('founder', 'payments for small businesses')
+    headers = auth_headers(founder)
+
+    response = client.put(f'/api/companies/{founder.company_id}', json={'valuation': valuation}, headers=headers)
+    assert (response.status_code, response.get_json()) == (400, {'error': error})
+    response = client.post('/api/companies/add', json=dict(NEW_COMPANY, valuation=valuation), headers=headers)
+    assert (response.status_code, response.get_json()) == (400, {'error': error})
+
+def test_company_reads_revalidate_against_the_row_version(client, make_user, auth_headers):
+    founder = make_user('founder', 'payments for small businesses')
+    headers = auth_headers(founder)
+    url = f'/api/companies/{founder.company_id}'
+    response = client.get(url, headers=headers)
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+    # With no cached body, revalidating only reads the row version
+    invalidate(company_key(founder.company_id))
+    with record_requests() as recorded:
+        response = client.get(url, headers={**headers, 'If-None-Match': etag})
+    assert (response.status_code, response.headers['ETag']) == (304, etag)
+    assert len(recorded[0].statements) == 1
+
+    client.put(url, json={'name': 'Renamed'}, headers=headers)
+    response = client.get(url, headers={**headers, 'If-None-Match': etag})
+    assert (response.status_code, response.get_json()['name']) == (200, 'Renamed')
+    assert response.headers['ETag'] != etag
@@ -0,0 +1,92 @@
+from flask import g
+from app import db
+from models import User
+from caching import RedisCache
+import db_routing
+import pytest
+
+@pytest.fixture(params=['local', 'shared'])
+def app_settings(request, tmp_path):
+    """Two SQLite files standing in for the primary and its replica."""
+    settings = {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "primary.db"}',
+        'DATABASE_REPLICA_URL': f'sqlite:///{tmp_path / "replica.db"}'
+    }
+    if request.param == 'shared':
+        settings['DATABASE_REPLICA_STICKY_CACHE_URL'] = request.getfixturevalue('redis_url')
+    return settings
+
+@pytest.fixture(autouse=True)
+def replica(app):
+    """The replica's engine, with the schema replication would have given it."""
+    engine = db.engines[db_routing.REPLICA_BIND]
+    db.metadata.create_all(engine)
+    return engine
+
+def replicate(replica):
+    """Copy every row from the primary to the replica, as replication eventually would."""
+    db.session.commit()
+    with replica.begin() as copy:
+        for table in reversed(db.metadata.sorted_tables):
+            copy.execute(table.delete())
+        for table in db.metadata.sorted_tables:
+            rows = [dict(row) for row in db.session.execute(table.select()).mappings()]
+            if rows:
+                copy.execute(table.insert(), rows)
+
+def reads_from(app, headers):
+    """Where a GET with these headers would send its reads."""
+    with app.test_request_context('/api/users/profile', headers=headers):
+        app.preprocess_request()
+        return g.db_reads_from
+
+def test_a_user_who_wrote_reads_from_the_primary_without_cookies(app, client, make_user, auth_headers):
+    writer = make_user('founder', 'payments')
+    reader = make_user('investor', 'payments')
+    headers = auth_headers(writer)
+    assert reads_from(app, headers) == 'replica'
+
+    response = client.put('/api/users/profile', json={'bio': 'Updated'}, headers=headers)
+
+    assert response.status_code == 200
+    assert 'Set-Cookie' not in response.headers
+    assert reads_from(app, headers) == 'primary'
+    assert reads_from(app, auth_headers(reader)) == 'replica'
+    if app.config['DATABASE_REPLICA_STICKY_CACHE_URL']:
+        # Another worker sees the write through the shared cache
+        other_worker = RedisCache(app.config['DATABASE_REPLICA_STICKY_CACHE_URL'], prefix='db_wrote:')
+        assert other_worker.get(str(writer.id)) is not None
+
+def test_a_new_account_reads_its_own_signup_from_the_primary(app, client):
+    response = client.post('/api/auth/signup', json={
+        'email': 'new@example.com', 'password': 'password', 'name': 'New', 'role': 'founder'
+    })
+
+    assert response.status_code == 201
+    headers = {'Authorization': f'Bearer {response.get_json()["access_token"]}'}
+    assert reads_from(app, headers) == 'primary'
+
+def test_bad_tokens_are_left_to_the_view(app, client):
+    assert reads_from(app, {'Authorization': 'Bearer not-a-token'}) == 'replica'
+    assert client.get('/api/users/profile', headers={'Authorization': 'Bearer not-a-token'}).status_code == 422
+
+def test_reads_come_from_the_replica_until_the_user_writes(client, make_user, auth_headers, replica):
+    founder = make_user('founder', 'payments', name='Ada')
+    investor = make_user('investor', 'payments', name='Grace')
+    replicate(replica)
+    headers = auth_headers(founder)
+
+    # Written on the primary only, as if replication were lagging
+    founder.bio = 'Not replicated yet'
+    db.session.get(User, investor.id).name = 'Hopper'
+    db.session.commit()
+
+    assert client.get('/api/auth/me', headers=headers).get_json()['bio'] is None
+    assert [user['name'] for user in client.get('/api/users/search?q=grace', headers=headers).get_json()['users']] == ['Grace']
+    assert client.get('/api/users/search?q=hopper', headers=headers).get_json()['users'] == []
+
+    assert client.put('/api/users/profile', json={'name': 'Ada L'}, headers=headers).status_code == 200
+
+    me = client.get('/api/auth/me', headers=headers).get_json()
+    assert (me['name'], me['bio']) == ('Ada L', 'Not replicated yet')
+    assert [user['name'] for user in client.get('/api/users/search?q=hopper', headers=headers).get_json()['users']] == ['Hopper']
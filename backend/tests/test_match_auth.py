@@ -0,0 +1,14 @@
+from app import db
+from models import Match
+from match_auth import users_are_matched
+
+def test_a_pair_matched_after_a_refusal_is_allowed(app, make_user):
+    founder = make_user('founder', 'payments')
+    investor = make_user('investor', 'payments')
+    assert not users_are_matched(founder.id, investor.id)
+
+    # Matched through another worker, which can't clear this worker's cache
+    db.session.add(Match(founder_id=founder.id, investor_id=investor.id, status='pending'))
+    db.session.commit()
+
+    assert users_are_matched(investor.id, founder.id)
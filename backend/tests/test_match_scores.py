@@ -0,0 +1,115 @@
+import pytest
+from app import db
+from models import MatchScore
+import match_scores
+from concurrent.futures import ThreadPoolExecutor
+from response_cache import invalidate, matches_key
+
+def test_companies_added_after_the_index_was_fit_are_scored(client, make_user, auth_headers):
+    founder = make_user('founder', 'payments for small businesses', industry='fintech')
+    make_user('investor', 'clinical trials for hospitals', industry='health')
+    assert client.get('/api/matchmaking/matches', headers=auth_headers(founder)).get_json()['matches'] == []
+
+    # Inserted without refitting this process's index, as another worker or an import would
+    investor = make_user('investor', 'payments for small businesses', industry='fintech')
+    invalidate(matches_key(founder.id))
+
+    matches = client.get('/api/matchmaking/matches', headers=auth_headers(founder)).get_json()['matches']
+
+    assert [match['user']['id'] for match in matches] == [investor.id]
+    assert matches[0]['match_score'] > 0.9
+
+def test_scores_written_concurrently_are_overwritten_not_duplicated(app, make_user, monkeypatch):
+    founder = make_user('founder', 'payments for small businesses')
+    investor = make_user('investor', 'payments for small businesses')
+    score_pairs = match_scores.score_pairs
+
+    def racing_score_pairs(*args, **kwargs):
+        # Another request stores the pair after our anti-join but before our insert
+        with db.engine.begin() as connection:
+            connection.execute(db.insert(MatchScore).values(
+                founder_company_id=founder.company_id, investor_company_id=investor.company_id,
+                score=0.5, version=match_scores.score_version()
+            ))
+        return score_pairs(*args, **kwargs)
+
+    monkeypatch.setattr(match_scores, 'score_pairs', racing_score_pairs)
+    match_scores.ensure_scores(founder.company, 'founder')
+
+    rows = MatchScore.query.all()
+    assert len(rows) == 1
+    assert rows[0].score > 0.9
+
+def test_rebuild_keeps_a_bounded_number_of_blocks_in_flight(app, make_user, monkeypatch):
+    founders = [make_user('founder', f'payments for small businesses {k}') for k in range(6)]
+    investors = [make_user('investor', 'payments for small businesses') for _ in range(2)]
+    submitted = []
+
+    class RecordingExecutor(ThreadPoolExecutor):
+        def submit(self, fn, *args):
+            submitted.append(args)
+            return super().submit(fn, *args)
+
+    monkeypatch.setattr(match_scores, 'ProcessPoolExecutor', RecordingExecutor)
+    for done, total, written in match_scores.rebuild_scores(workers=1, chunk_size=1):
+        # Blocks written so far, plus at most BLOCKS_IN_FLIGHT_PER_WORKER more
+        assert len(submitted) <= done + match_scores.BLOCKS_IN_FLIGHT_PER_WORKER
+
+    assert done == total == len(founders)
+    assert MatchScore.query.count() == len(founders) * len(investors)
+
+def test_rows_scored_from_an_older_fit_are_recomputed_not_trusted(app, make_user):
+    founder = make_user('founder', 'payments for small businesses')
+    make_user('investor', 'payments for small businesses')
+    match_scores.ensure_scores(founder.company, 'founder')
+
+    # A worker still holding an outdated fit stored a wrong score
+    row = MatchScore.query.one()
+    row.score = 0.0
+    db.session.commit()
+    stale_version = row.vectors_version
+
+    # Any new company means a new fit, so rows from the old one are recomputed
+    make_user('investor', 'clinical trials for hospitals')
+    vectors_version = match_scores.ensure_scores(founder.company, 'founder')
+
+    assert vectors_version != stale_version
+    assert {row.vectors_version for row in MatchScore.query} == {vectors_version}
+    assert max(row.score for row in MatchScore.query) > 0.9
+
+@pytest.mark.parametrize('compat', [True, False])
+def test_vectorized_scores_match_the_scalar_formula(app, make_user, compat):
+    app.config['MATCH_SCORE_COMPAT'] = compat
+    founder = make_user('founder', 'payments for small businesses', industry='fintech', valuation=5e6).company
+    stages = ['seed', 'series_a', 'growth', None]
+    industries = ['fintech', 'health', None]
+    valuations = [None, 0, 1e5, 5e6, 2e9]
+    investors = [
+        make_user(
+            'investor', f'payments {k} for small businesses', industry=industries[k % 3],
+            funding_stage=stages[k % 4], valuation=valuations[k % 5]
+        ).company
+        for k in range(match_scores.VECTORIZE_MIN_POOL)
+    ]
+
+    vectorized = match_scores.score_pairs(founder, 'founder', investors)
+    reverse = [match_scores.score_pairs(investor, 'investor', [founder] * len(investors))[0] for investor in investors[:3]]
+    scalar = [match_scores.pair_score(founder, investor) for investor in investors]
+
+    assert vectorized == pytest.approx(scalar)
+    assert reverse == pytest.approx(scalar[:3])
+
+def test_missing_and_negative_valuations_are_left_out_of_the_score(app, make_user, client, auth_headers):
+    founder = make_user('founder', 'payments for small businesses', industry='fintech', valuation=-5)
+    missing = make_user('investor', 'payments for small businesses', industry='fintech', valuation=None).company
+    negative = make_user('investor', 'payments for small businesses', industry='fintech', valuation=-1e6).company
+
+    # The original formula never reads valuations
+    assert client.get('/api/matchmaking/matches', headers=auth_headers(founder)).status_code == 200
+
+    app.config['MATCH_SCORE_COMPAT'] = False
+    similarity_only = match_scores.score_pairs(founder.company, 'founder', [missing], compat=True)[0]
+    for pool in ([missing, negative], [missing, negative] * match_scores.VECTORIZE_MIN_POOL):
+        scores = match_scores.score_pairs(founder.company, 'founder', pool)
+        # Industry match counts, valuation fit doesn't
+        assert scores == pytest.approx([similarity_only + match_scores.INDUSTRY_MATCH_WEIGHT] * len(pool))
@@ -0,0 +1,52 @@
+import pytest
+
+DESCRIPTIONS = [
+    'payments for small businesses',
+    'payments API and fraud detection',
+    'small businesses cash flow and payments',
+    'clinical trials for hospitals',
+    'carbon accounting for logistics fleets'
+]
+
+@pytest.fixture
+def founder(make_user):
+    return make_user('founder', 'Payments API helping small businesses get paid', industry='fintech')
+
+def make_investors(make_user, count):
+    return [
+        make_user('investor', f'Investing in {DESCRIPTIONS[k % len(DESCRIPTIONS)]}', industry='fintech')
+        for k in range(count)
+    ]
+
+@pytest.mark.query_budget(8)
+def test_matches_query_count_does_not_grow_with_candidates(client, make_user, founder, auth_headers):
+    make_investors(make_user, 40)
+
+    response = client.get('/api/matchmaking/matches', headers=auth_headers(founder))
+
+    assert response.status_code == 200
+    assert 0 < len(response.get_json()['matches']) <= 10
+
+@pytest.mark.query_budget(8)
+def test_matches_excludes_existing_matches(client, make_user, founder, auth_headers):
+    investors = make_investors(make_user, 6)
+    headers = auth_headers(founder)
+    first = client.get('/api/matchmaking/matches', headers=headers).get_json()['matches'][0]['user']['id']
+
+    assert client.post('/api/matchmaking/connect', json={'target_user_id': first}, headers=headers).status_code == 201
+
+    matches = client.get('/api/matchmaking/matches', headers=headers).get_json()['matches']
+    assert first not in [match['user']['id'] for match in matches]
+    assert {match['user']['id'] for match in matches} <= {investor.id for investor in investors}
+
+def test_matches_follow_a_new_company_under_an_older_token(client, make_user, founder, auth_headers):
+    investors = [make_user('investor', description) for description in DESCRIPTIONS]
+    headers = auth_headers(founder)
+    assert client.get('/api/matchmaking/matches', headers=headers).get_json()['matches'][0]['user']['id'] == investors[0].id
+
+    new_company = {'name': 'Trials Co', 'description': 'clinical trials for hospitals', 'industry': 'health', 'funding_stage': 'seed'}
+    assert client.post('/api/companies/add', json=new_company, headers=headers).status_code == 201
+
+    # Still sending the token whose company_id claim names the old company
+    matches = client.get('/api/matchmaking/matches', headers=headers).get_json()['matches']
+    assert matches[0]['user']['id'] == investors[3].id
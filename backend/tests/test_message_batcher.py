@@ -0,0 +1,68 @@
+from app import socketio
+from models import Message
+from message_batcher import MessageBatcher
+import pytest
+
+@pytest.fixture
+def pair(make_user):
+    return make_user('founder', 'payments'), make_user('investor', 'payments')
+
+def test_a_failed_emit_still_acks_the_saved_message(app, pair, monkeypatch):
+    founder, investor = pair
+    def failing_emit(*args, **kwargs):
+        raise ConnectionError('message queue unavailable')
+    monkeypatch.setattr(socketio, 'emit', failing_emit)
+    batcher = MessageBatcher(window=0)
+
+    first = batcher.submit(founder.id, investor.id, 'first', timeout=5)
+    second = batcher.submit(founder.id, investor.id, 'second', timeout=5)
+
+    assert [first['content'], second['content']] == ['first', 'second']
+    assert Message.query.count() == 2
+
+def test_the_flusher_survives_a_failed_batch(app, pair, monkeypatch):
+    founder, investor = pair
+    batcher = MessageBatcher(window=0)
+    flush = batcher._flush
+    calls = []
+
+    def flaky_flush(batch):
+        calls.append(batch)
+        if len(calls) == 1:
+            raise RuntimeError('flush blew up')
+        return flush(batch)
+    monkeypatch.setattr(batcher, '_flush', flaky_flush)
+
+    with pytest.raises(RuntimeError):
+        batcher.submit(founder.id, investor.id, 'lost', timeout=5)
+    assert batcher.submit(founder.id, investor.id, 'saved', timeout=5)['content'] == 'saved'
+
+def test_a_dead_flusher_is_restarted(app, pair, monkeypatch):
+    from greenlet import GreenletExit
+
+    founder, investor = pair
+    batcher = MessageBatcher(window=0)
+    sleep = socketio.sleep
+    sleeps = []
+
+    def killed_once(seconds=0):
+        # The first flusher is killed before it picks up the queued message
+        sleeps.append(seconds)
+        if len(sleeps) == 1:
+            raise GreenletExit
+        return sleep(seconds)
+    monkeypatch.setattr(socketio, 'sleep', killed_once)
+
+    with pytest.raises(TimeoutError):
+        batcher.submit(founder.id, investor.id, 'lost', timeout=0.2)
+    assert batcher.submit(founder.id, investor.id, 'saved', timeout=5)['content'] == 'saved'
+    assert [message.content for message in Message.query] == ['saved']
+
+def test_submit_times_out_without_writing_the_message(app, pair, monkeypatch):
+    founder, investor = pair
+    monkeypatch.setattr(socketio, 'start_background_task', lambda *args: None)
+    batcher = MessageBatcher(window=0)
+
+    with pytest.raises(TimeoutError, match='Timed out waiting to save the message$'):
+        batcher.submit(founder.id, investor.id, 'never written', timeout=0.1)
+    assert batcher._pending == []
@@ -0,0 +1,61 @@
+from app import db
+from metrics import Histogram, timed_event
+from models import User
+
+# Metrics are process-wide and accumulate across tests, so compare before and after
+def sample(client, series):
+    """Value of one series (name and labels as exported) from /metrics, or 0 if it isn't there yet."""
+    for line in client.get('/metrics').get_data(as_text=True).splitlines():
+        name, _, value = line.rpartition(' ')
+        if name == series:
+            return float(value)
+    return 0.0
+
+GET_USER = 'blueprint="user",endpoint="user.get_user"'
+
+def test_requests_are_exported_with_latency_and_sql_counts(client, make_user, auth_headers):
+    user = make_user('founder', 'payments')
+    headers = auth_headers(user)
+    series = [
+        f'http_requests_total{{{GET_USER},method="GET",status="200"}}',
+        f'http_request_duration_seconds_count{{{GET_USER},method="GET"}}',
+        f'http_request_sql_statements_count{{{GET_USER}}}',
+        f'http_request_sql_statements_sum{{{GET_USER}}}',
+    ]
+    before = [sample(client, name) for name in series]
+
+    # The second read is served from the response cache without touching the database
+    client.get(f'/api/users/{user.id}', headers=headers)
+    after_miss = [sample(client, name) for name in series]
+    client.get(f'/api/users/{user.id}', headers=headers)
+    after_hit = [sample(client, name) for name in series]
+
+    assert [b - a for a, b in zip(before, after_miss)][:3] == [1, 1, 1]
+    assert after_miss[3] > before[3]
+    assert [b - a for a, b in zip(after_miss, after_hit)] == [1, 1, 1, 0]
+    assert client.get('/metrics').content_type.startswith('text/plain; version=0.0.4')
+
+def test_socket_events_are_timed_with_their_sql_counts(app, client):
+    @timed_event('test_event')
+    def handler():
+        return User.query.count() + db.session.query(User.id).count()
+
+    before = sample(client, 'socketio_event_sql_statements_sum{event="test_event"}')
+    with app.test_request_context():
+        assert handler() == 0
+
+    assert sample(client, 'socketio_event_sql_statements_sum{event="test_event"}') - before == 2
+    assert sample(client, 'socketio_event_duration_seconds_count{event="test_event"}') >= 1
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('example_seconds', 'Example.', ('route',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(('home',), value)
+
+    assert histogram.render()[2:] == [
+        'example_seconds_bucket{route="home",le="0.1"} 1',
+        'example_seconds_bucket{route="home",le="1"} 3',
+        'example_seconds_bucket{route="home",le="+Inf"} 4',
+        'example_seconds_sum{route="home"} 6.05',
+        'example_seconds_count{route="home"} 4',
+    ]
@@ -0,0 +1,63 @@
+import logging
+import pytest
+from app import db
+from models import Company, User
+from query_inspector import fingerprint, record_requests, repeated_statements
+
+@pytest.fixture
+def app_settings():
+    return {'QUERY_INSPECTOR': True, 'QUERY_INSPECTOR_REPEAT_THRESHOLD': 3, 'QUERY_INSPECTOR_SLOW_MS': 1}
+
+@pytest.fixture
+def n_plus_one(app, make_user):
+    """A route that loads each user's company one query at a time; returns its path."""
+    for k in range(4):
+        make_user('founder', f'company {k}')
+
+    def companies():
+        names = []
+        for user in User.query.all():
+            names.append(Company.query.filter_by(id=user.company_id).first().name)
+        return {'names': names}
+
+    app.add_url_rule('/n-plus-one', 'n_plus_one', companies)
+    return '/n-plus-one'
+
+def test_statements_differing_only_in_literals_share_a_fingerprint():
+    assert fingerprint("SELECT * FROM user WHERE id = 7 AND name = 'O''Brien'") == \
+        fingerprint("SELECT  *\nFROM user WHERE id = 12 AND name = 'Ada'") == \
+        'SELECT * FROM user WHERE id = ? AND name = ?'
+    assert fingerprint('SELECT * FROM user WHERE id IN (?, ?, ?)') == fingerprint('SELECT * FROM user WHERE id IN (?)')
+
+def test_repeated_statement_shapes_are_logged_with_route_and_caller(client, n_plus_one, caplog):
+    with caplog.at_level(logging.WARNING, logger='query_inspector'):
+        client.get(n_plus_one)
+
+    warning, = [record.getMessage() for record in caplog.records if 'Possible N+1' in record.getMessage()]
+    assert warning.startswith('Possible N+1 in GET /n-plus-one (n_plus_one): 4 x SELECT company.')
+    assert warning.endswith('first issued at tests/test_query_inspector.py:20 in companies')
+
+def test_recorded_requests_report_repeated_statements(client, n_plus_one):
+    with record_requests() as recorded:
+        client.get(n_plus_one)
+
+    queries, = recorded
+    assert (queries.method, queries.path, queries.endpoint, len(queries.statements)) == ('GET', n_plus_one, 'n_plus_one', 5)
+    (count, statement), = repeated_statements(queries.statements, 2)
+    assert count == 4 and statement.fingerprint.startswith('SELECT company.')
+
+def test_slow_statements_are_logged(app, client, caplog):
+    def slow():
+        # Counting through a recursive CTE keeps SQLite busy well past a millisecond
+        return {'rows': db.session.execute(db.text(
+            'WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 200000) SELECT count(*) FROM n'
+        )).scalar()}
+
+    app.add_url_rule('/slow', 'slow', slow)
+    with caplog.at_level(logging.WARNING, logger='query_inspector'):
+        assert client.get('/slow').get_json() == {'rows': 200000}
+
+    assert any(
+        record.getMessage().startswith('Slow query') and 'GET /slow' in record.getMessage() and 'WITH RECURSIVE' in record.getMessage()
+        for record in caplog.records
+    )
@@ -0,0 +1,94 @@
+from caching import LRUCache, RedisCache
+from response_cache import ResponseCache, company_key, init_response_cache
+import response_cache
+import threading
+import time
+import pytest
+
+@pytest.fixture(params=['local', 'shared'])
+def cache_tier(request, app):
+    """Run with the in-process cache alone, then with a shared tier on the Redis stand-in."""
+    if request.param == 'shared':
+        app.config['RESPONSE_CACHE_URL'] = request.getfixturevalue('redis_url')
+        init_response_cache(app)
+    return request.param
+
+def test_update_company_invalidates_the_cached_company(client, make_user, auth_headers, cache_tier):
+    founder = make_user('founder', 'payments for small businesses')
+    headers = auth_headers(founder)
+    url = f'/api/companies/{founder.company_id}'
+    assert client.get(url, headers=headers).get_json()['description'] == 'payments for small businesses'
+
+    response = client.put(url, json={'description': 'clinical trials'}, headers=headers)
+
+    assert response.status_code == 200
+    assert client.get(url, headers=headers).get_json()['description'] == 'clinical trials'
+    if cache_tier == 'shared':
+        # Other workers read through the shared tier, which must not keep the old body
+        other_worker = ResponseCache(LRUCache(), response_cache.response_cache.shared)
+        assert b'clinical trials' in other_worker.get(company_key(founder.company_id))[1]
+
+def test_create_match_invalidates_both_match_lists(client, make_user, auth_headers, cache_tier):
+    founder = make_user('founder', 'payments for small businesses')
+    investor = make_user('investor', 'payments for small businesses')
+    for user in (founder, investor):
+        assert client.get('/api/matchmaking/matches', headers=auth_headers(user)).get_json()['matches']
+
+    response = client.post(
+        '/api/matchmaking/connect', json={'target_user_id': investor.id}, headers=auth_headers(founder)
+    )
+
+    assert response.status_code == 201
+    for user in (founder, investor):
+        assert client.get('/api/matchmaking/matches', headers=auth_headers(user)).get_json()['matches'] == []
+
+def test_company_and_profile_edits_reach_other_users_match_lists(client, make_user, auth_headers, cache_tier):
+    founder = make_user('founder', 'payments for small businesses')
+    investor = make_user('investor', 'payments for small businesses')
+    investor_headers = auth_headers(investor)
+    listed = client.get('/api/matchmaking/matches', headers=investor_headers).get_json()['matches']
+    assert [match['user']['id'] for match in listed] == [founder.id]
+
+    # Edits by the founder, who isn't a member of the investor's company
+    client.put('/api/users/profile', json={'name': 'Renamed Founder'}, headers=auth_headers(founder))
+    listed = client.get('/api/matchmaking/matches', headers=investor_headers).get_json()['matches']
+    assert [match['user']['name'] for match in listed] == ['Renamed Founder']
+
+    client.put(f'/api/companies/{founder.company_id}', json={'description': 'clinical trials'}, headers=auth_headers(founder))
+    assert client.get('/api/matchmaking/matches', headers=investor_headers).get_json()['matches'] == []
+    if cache_tier == 'shared':
+        # The generation is kept in the shared tier, so every worker moves past the old lists
+        other_worker = ResponseCache(LRUCache(), response_cache.response_cache.shared)
+        assert other_worker.generation('matches') == 2
+
+def stampede(caches, threads_per_cache=8, build_seconds=0.2):
+    """Miss on one key from many threads at once; returns how often it was built."""
+    builds = []
+    start = threading.Barrier(len(caches) * threads_per_cache)
+
+    def build():
+        builds.append(1)
+        time.sleep(build_seconds)
+        return 'etag', b'body'
+
+    def fetch(cache):
+        start.wait()
+        assert cache.get_or_build('hot', build) == ('etag', b'body')
+
+    threads = [
+        threading.Thread(target=fetch, args=(cache,))
+        for cache in caches for _ in range(threads_per_cache)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(builds)
+
+def test_concurrent_misses_in_one_worker_build_once():
+    assert stampede([ResponseCache(LRUCache())]) == 1
+
+def test_concurrent_misses_across_workers_build_once(redis_url):
+    # Each worker has its own local tier and locks; only the shared tier is common
+    workers = [ResponseCache(LRUCache(), RedisCache(redis_url, prefix='response:')) for _ in range(3)]
+    assert stampede(workers) == 1
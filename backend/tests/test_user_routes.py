@@ -0,0 +1,38 @@
+import pytest
+from passwords import needs_rehash
+from query_inspector import record_requests
+from response_cache import invalidate, user_key
+
+def test_profile_password_change_uses_the_configured_hash(app, client, make_user, auth_headers):
+    user = make_user('founder', 'payments')
+
+    response = client.put('/api/users/profile', json={'password': 'new password'}, headers=auth_headers(user))
+
+    assert response.status_code == 200
+    assert not needs_rehash(user.password_hash)
+    login = client.post('/api/auth/login', json={'email': user.email, 'password': 'new password'})
+    assert login.status_code == 200
+
+@pytest.mark.parametrize('path', ['/api/users/{id}', '/api/users/profile'])
+def test_user_reads_revalidate_against_user_and_company_row_versions(client, make_user, auth_headers, path):
+    founder = make_user('founder', 'payments for small businesses')
+    headers = auth_headers(founder)
+    url = path.format(id=founder.id)
+    response = client.get(url, headers=headers)
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+    invalidate(user_key(founder.id))
+    with record_requests() as recorded:
+        response = client.get(url, headers={**headers, 'If-None-Match': etag})
+    assert (response.status_code, response.headers['ETag']) == (304, etag)
+    assert len(recorded[0].statements) == 1
+
+    # The user's payload embeds their company, so a company edit is a change too
+    client.put(f'/api/companies/{founder.company_id}', json={'name': 'Renamed'}, headers=headers)
+    response = client.get(url, headers={**headers, 'If-None-Match': etag})
+    assert (response.status_code, response.get_json()['company']['name']) == (200, 'Renamed')
+
+    client.put('/api/users/profile', json={'bio': 'Second-time founder'}, headers=headers)
+    response = client.get(url, headers={**headers, 'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 200
@@ -0,0 +1,26 @@
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from app import db
+from user_search import include_in_migrations
+import pytest
+
+@pytest.fixture
+def searcher(make_user):
+    make_user('founder', 'payments', name='Ada Lovelace')
+    return make_user('investor', 'payments', name='Grace Hopper')
+
+def search(client, auth_headers, user, q):
+    response = client.get('/api/users/search', query_string={'q': q}, headers=auth_headers(user))
+    return [found['name'] for found in response.get_json()['users']]
+
+def test_search_matches_name_prefixes(client, auth_headers, searcher):
+    assert search(client, auth_headers, searcher, 'lovel') == ['Ada Lovelace']
+
+@pytest.mark.parametrize('q', ['"', '*', '-- ()'])
+def test_punctuation_only_queries_match_nobody(client, auth_headers, searcher, q):
+    assert search(client, auth_headers, searcher, q) == []
+
+def test_autogenerate_leaves_the_search_index_alone(app):
+    with db.engine.connect() as connection:
+        context = MigrationContext.configure(connection, opts={'include_object': include_in_migrations})
+        assert compare_metadata(context, db.metadata) == []
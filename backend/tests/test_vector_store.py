@@ -0,0 +1,61 @@
+from app import db
+from models import MatchScore
+import match_scores
+from vector_store import build_vector_store, load_vector_store, store_directory
+import pytest
+
+DESCRIPTIONS = [
+    'payments for small businesses',
+    'clinical trials for hospitals',
+    'carbon accounting for logistics fleets',
+    'payments API and fraud detection',
+    'hospital staffing and scheduling'
+]
+
+@pytest.fixture
+def companies(make_user):
+    founder = make_user('founder', 'payments for small businesses').company
+    investors = [make_user('investor', description).company for description in DESCRIPTIONS]
+    build_vector_store(store_directory(), n_components=4)
+    return founder, investors
+
+def test_edited_companies_are_scored_from_their_current_text(app, companies):
+    founder, investors = companies
+    store = load_vector_store()
+    before = store.similarities(founder, investors)
+
+    founder.description = 'clinical trials for hospitals'
+    db.session.commit()
+    after = store.similarities(founder, investors)
+
+    assert before.argmax() == 0
+    assert after.argmax() == 1
+    assert after[1] == pytest.approx(1.0, abs=1e-5)
+
+def test_companies_added_since_the_build_share_the_stored_scale(app, make_user, companies):
+    founder, investors = companies
+    twin = make_user('investor', DESCRIPTIONS[0]).company
+    store = load_vector_store()
+
+    assert twin.id not in store.rows
+    indexed, unindexed = store.similarities(founder, [investors[0], twin])
+    assert unindexed == pytest.approx(indexed, abs=1e-5)
+
+def test_scores_from_before_a_build_are_not_ranked_with_it(app, make_user):
+    founder = make_user('founder', 'payments for small businesses')
+    investors = [make_user('investor', description) for description in DESCRIPTIONS]
+    match_scores.ensure_scores(founder.company, 'founder')
+
+    # A TF-IDF score that would top the ranking if it were mixed in
+    unrelated = investors[2]
+    db.session.get(MatchScore, (founder.company_id, unrelated.company_id)).score = 10.0
+    db.session.commit()
+
+    store = build_vector_store(store_directory(), n_components=4)
+    vectors_version = match_scores.ensure_scores(founder.company, 'founder')
+    ranked = match_scores.top_matches(founder.company, 'founder', vectors_version=vectors_version)
+
+    assert vectors_version == store.version
+    assert {row.vectors_version for row in MatchScore.query} == {store.version}
+    assert ranked[0][0].id == investors[0].id
+    assert all(score <= 1.0 for _, score in ranked)
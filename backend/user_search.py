@@ -0,0 +1,84 @@
+from models import User, db
+from sqlalchemy import event, DDL
+import re
+
+# The index is maintained by the database itself (triggers on SQLite, a
+# generated column on PostgreSQL), so every insert or update of a user's name
+# or bio is reflected in the same transaction.
+SEARCH_DDL = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE user_fts USING fts5(name, bio, content='user', content_rowid='id')",
+        'CREATE TRIGGER user_fts_ai AFTER INSERT ON "user" BEGIN '
+        "INSERT INTO user_fts(rowid, name, bio) VALUES (new.id, new.name, new.bio); END",
+        'CREATE TRIGGER user_fts_ad AFTER DELETE ON "user" BEGIN '
+        "INSERT INTO user_fts(user_fts, rowid, name, bio) VALUES ('delete', old.id, old.name, old.bio); END",
+        'CREATE TRIGGER user_fts_au AFTER UPDATE OF name, bio ON "user" BEGIN '
+        "INSERT INTO user_fts(user_fts, rowid, name, bio) VALUES ('delete', old.id, old.name, old.bio); "
+        "INSERT INTO user_fts(rowid, name, bio) VALUES (new.id, new.name, new.bio); END",
+    ],
+    'postgresql': [
+        'ALTER TABLE "user" ADD COLUMN search_vector tsvector GENERATED ALWAYS AS '
+        "(to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(bio, ''))) STORED",
+        'CREATE INDEX ix_user_search_vector ON "user" USING GIN (search_vector)',
+    ],
+}
+
+for dialect, statements in SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(User.__table__, 'after_create', DDL(statement).execute_if(dialect=dialect))
+
+# Not part of db.metadata, so create_all leaves the virtual table to the DDL above
+user_fts = db.Table(
+    'user_fts', db.MetaData(),
+    db.Column('rowid', db.Integer),
+    db.Column('rank', db.Float)
+)
+
+def include_in_migrations(object, name, type_, reflected, compare_to):
+    """Alembic `include_object` hook that hides the search index from autogenerate.
+
+    The DDL above isn't in the models' metadata, so without this every
+    `flask db migrate` would propose dropping the index.
+    """
+    if type_ == 'table':
+        # user_fts and the FTS5 shadow tables (user_fts_data, user_fts_idx, ...)
+        return not name.startswith('user_fts')
+    if type_ == 'column':
+        return name != 'search_vector'
+    if type_ == 'index':
+        return name != 'ix_user_search_vector'
+    return True
+
+def search_terms(text):
+    return re.findall(r'\w+', text.lower())
+
+def apply_search(query, text):
+    """Filter a User query by full-text match on name and bio, best matches first.
+
+    Every term is matched as a prefix and all terms must match. Text with no
+    searchable terms, such as only punctuation, matches nobody. Databases
+    without a full-text index fall back to a substring match.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return query.filter(db.false()) if text.strip() else query
+
+    dialect = db.engine.dialect.name
+
+    if dialect == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return query.join(user_fts, user_fts.c.rowid == User.id).filter(
+            db.literal_column('user_fts').op('MATCH')(match)
+        ).order_by(user_fts.c.rank, User.id)
+
+    if dialect == 'postgresql':
+        ts_query = db.func.to_tsquery('simple', ' & '.join(f'{term}:*' for term in terms))
+        search_vector = db.literal_column('"user".search_vector')
+        return query.filter(search_vector.op('@@')(ts_query)).order_by(
+            db.func.ts_rank(search_vector, ts_query).desc(), User.id
+        )
+
+    return query.filter(
+        (User.name.ilike(f'%{text}%')) |
+        (User.bio.ilike(f'%{text}%'))
+    )
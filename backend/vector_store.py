@@ -0,0 +1,177 @@
+from flask import current_app
+from company_index import CompanyIndex, company_text, get_company_index
+from models import Company
+from datetime import datetime
+import os
+import pickle
+import shutil
+
+# Name of the file that points at the currently published build
+CURRENT_FILE = 'CURRENT'
+
+class VectorStore:
+    """Dense, L2-normalised company vectors memory-mapped from a published build.
+
+    Every worker maps the same read-only file, so the vectors live once in the
+    page cache no matter how many processes use them. Exposes the same
+    `rows`/`vectors`/`similarities` interface as CompanyIndex.
+
+    The build also keeps each company's row version and the fitted TF-IDF and
+    LSA models. Companies added or edited since the build are projected from
+    their current text into the same space, so every score shares one scale.
+    """
+
+    def __init__(self, version, matrix, company_ids, row_versions, model_path):
+        self.version = version
+        self.matrix = matrix
+        self.company_ids = [int(company_id) for company_id in company_ids]
+        self.row_versions = [int(row_version) for row_version in row_versions]
+        self.rows = {company_id: row for row, company_id in enumerate(self.company_ids)}
+        self._model_path = model_path
+        self._model = None
+
+    @classmethod
+    def open(cls, path, version):
+        import numpy as np
+        model_path = os.path.join(path, 'model.pkl')
+        if not os.path.exists(model_path):
+            # Builds published before models were saved can't project new text
+            raise FileNotFoundError(model_path)
+        matrix = np.load(os.path.join(path, 'vectors.npy'), mmap_mode='r')
+        company_ids = np.load(os.path.join(path, 'ids.npy'))
+        row_versions = np.load(os.path.join(path, 'row_versions.npy'))
+        return cls(version, matrix, company_ids, row_versions, model_path)
+
+    def _project(self, companies):
+        from sklearn.preprocessing import normalize
+        import numpy as np
+
+        if self._model is None:
+            with open(self._model_path, 'rb') as f:
+                self._model = pickle.load(f)
+        vectorizer, svd = self._model
+        tfidf = vectorizer.transform([company_text(company) for company in companies])
+        return normalize(svd.transform(tfidf)).astype(np.float32)
+
+    def current_row(self, company):
+        """The company's row, or None if it was added or edited since the build."""
+        row = self.rows.get(company.id)
+        if row is None or self.row_versions[row] != company.row_version:
+            return None
+        return row
+
+    def vectors(self, companies):
+        """Vectors for `companies`: stored rows where current, projected text otherwise."""
+        import numpy as np
+
+        companies = list(companies)
+        vectors = np.zeros((len(companies), self.matrix.shape[1]), dtype=np.float32)
+        rows = [self.current_row(company) for company in companies]
+
+        stored = [i for i, row in enumerate(rows) if row is not None]
+        if stored:
+            vectors[stored] = self.matrix[[rows[i] for i in stored]]
+
+        stale = [i for i, row in enumerate(rows) if row is None]
+        if stale:
+            vectors[stale] = self._project([companies[i] for i in stale])
+        return vectors
+
+    def similarities(self, company, candidates):
+        """Cosine similarity of `company` against each of the `candidates` companies."""
+        candidates = list(candidates)
+        return self.vectors(candidates) @ self.vectors([company])[0]
+
+def store_directory():
+    return current_app.config['COMPANY_VECTOR_STORE']
+
+def build_vector_store(directory, n_components=256, keep=2):
+    """Reduce the company TF-IDF vectors with LSA and publish them as a new build.
+
+    The build is written to a temporary directory, renamed into place and then
+    published by atomically replacing the CURRENT pointer, so readers only ever
+    see a complete build. Returns the new store, or None if there is nothing
+    to index.
+    """
+    from sklearn.decomposition import TruncatedSVD
+    from sklearn.preprocessing import normalize
+    import numpy as np
+
+    companies = Company.query.all()
+    index = CompanyIndex.build(companies)
+    if index.matrix is None:
+        return None
+
+    # TruncatedSVD needs fewer components than features and documents
+    n_components = min(n_components, min(index.matrix.shape) - 1)
+    if n_components < 1:
+        return None
+
+    svd = TruncatedSVD(n_components=n_components, random_state=0)
+    vectors = normalize(svd.fit_transform(index.matrix)).astype(np.float32)
+    row_versions = {company.id: company.row_version for company in companies}
+
+    version = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+    os.makedirs(directory, exist_ok=True)
+    staging = os.path.join(directory, f'{version}.tmp')
+    os.makedirs(staging)
+    np.save(os.path.join(staging, 'vectors.npy'), vectors)
+    np.save(os.path.join(staging, 'ids.npy'), np.array(index.company_ids, dtype=np.int64))
+    np.save(os.path.join(staging, 'row_versions.npy'), np.array(
+        [row_versions[company_id] for company_id in index.company_ids], dtype=np.int64
+    ))
+    with open(os.path.join(staging, 'model.pkl'), 'wb') as f:
+        pickle.dump((index.vectorizer, svd), f)
+    os.replace(staging, os.path.join(directory, version))
+
+    pointer = os.path.join(directory, f'{CURRENT_FILE}.tmp')
+    with open(pointer, 'w') as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(directory, CURRENT_FILE))
+
+    _prune_builds(directory, keep)
+    return VectorStore.open(os.path.join(directory, version), version)
+
+def _prune_builds(directory, keep):
+    """Remove all but the newest `keep` builds. Mapped files stay readable until unmapped."""
+    builds = sorted(
+        name for name in os.listdir(directory)
+        if os.path.isdir(os.path.join(directory, name)) and not name.endswith('.tmp')
+    )
+    for name in builds[:-keep]:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+# Store mapped by this process and the CURRENT pointer stat it was opened for
+_store = None
+_store_stamp = None
+
+def load_vector_store(directory=None):
+    """Return the published vector store, remapping it when a new build is swapped in.
+
+    Returns None when no build has been published.
+    """
+    global _store, _store_stamp
+    directory = directory or store_directory()
+    pointer = os.path.join(directory, CURRENT_FILE)
+
+    try:
+        stat = os.stat(pointer)
+    except FileNotFoundError:
+        _store = _store_stamp = None
+        return None
+
+    stamp = (pointer, stat.st_mtime_ns, stat.st_ino)
+    if stamp != _store_stamp:
+        with open(pointer) as f:
+            version = f.read().strip()
+        try:
+            _store = VectorStore.open(os.path.join(directory, version), version)
+        except FileNotFoundError:
+            return None
+        _store_stamp = stamp
+    return _store
+
+def get_company_vectors():
+    """Return the shared memory-mapped store if one is published, else the live TF-IDF index."""
+    store = load_vector_store()
+    return store if store is not None else get_company_index()